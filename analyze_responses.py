@@ -1,5 +1,8 @@
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 from summarizer import SimpleTextSummarizer
+from telemetry import telemetry
+from response_store import ROW_HASH_COLUMN
 
 cols_quant = ['I felt like my voice mattered in this Seminar.',
               'The content of the Seminar was interesting to me.',
@@ -9,16 +12,31 @@ cols_quant = ['I felt like my voice mattered in this Seminar.',
 cols_qual = ['Let us know if you have more thoughts or feedback!']
 
 
-def quant_summary(df, agg_cols):
+def quant_stats(df, agg_cols):
+    """
+    Mergeable per-group statistics: sum and non-null count of each quant
+    column, plus the group size. Coarser groupings are exact sums of these.
+    """
     cols_quant_avail = [col for col in cols_quant if col in df.columns]
-    stats_means = df.groupby(agg_cols, dropna=False)[
-        cols_quant_avail].mean().round(3)
+    grouped = df.groupby(agg_cols, dropna=False, observed=True)
+    stats = pd.concat({'sum': grouped[cols_quant_avail].sum(),
+                       'n': grouped[cols_quant_avail].count()}, axis=1)
+    stats['size'] = grouped.size()
+    return stats
+
+
+def rollup_quant_stats(stats, agg_cols):
+    """Roll quant_stats up to a coarser grouping (a subset of its index levels)"""
+    return stats.groupby(level=agg_cols, dropna=False, observed=True).sum()
+
+
+def quant_summary_from_stats(stats, agg_cols):
+    cols_quant_avail = list(stats['sum'].columns)
+    stats_means = stats['sum'].div(stats['n'].where(stats['n'] > 0)).round(3)
     stats_means['mean_overall'] = stats_means[cols_quant_avail].mean(
         axis=1).round(3)
-    stats_counts = df.groupby(
-        agg_cols, dropna=False).size().reset_index(name='count')
-    stats = pd.merge(stats_means, stats_counts, on=agg_cols,
-                     left_index=False, right_index=False)
+    stats_means['count'] = stats['size']
+    stats = stats_means.reset_index()
     # Filter to topics with at least 5 responses
     stats = stats[stats['count'] >= 5]
     stats = stats.sort_values(by='mean_overall', ascending=False)
@@ -26,44 +44,178 @@ def quant_summary(df, agg_cols):
     return stats
 
 
-def guide_level_summary(df):
-    summary = all_feedback_combined(df, 'Guide')
+def quant_summary(df, agg_cols):
+    return quant_summary_from_stats(quant_stats(df, agg_cols), agg_cols)
+
+
+def guide_level_summary(df, **kwargs):
+    summary = all_feedback_combined(df, 'Guide', **kwargs)
     return summary
 
 
-def topic_level_summary(df):
-    summary = all_feedback_combined(df, 'matched_topic')
+def topic_level_summary(df, **kwargs):
+    summary = all_feedback_combined(df, 'matched_topic', **kwargs)
     return summary
 
 
-def topic_guide_level_summary(df):
-    summary = all_feedback_combined(df, ['matched_topic', 'Guide'])
+def topic_guide_level_summary(df, **kwargs):
+    summary = all_feedback_combined(df, ['matched_topic', 'Guide'], **kwargs)
     return summary
 
 
-def qual_summary(df, agg_cols):
+def feedback_row_ids(df):
+    """Stable row IDs: the response store's row hash, else a hash of timestamp and feedback"""
+    if ROW_HASH_COLUMN in df.columns:
+        return df[ROW_HASH_COLUMN].astype('uint64')
+    cols = [col for col in ['Timestamp'] + cols_qual if col in df.columns]
+    return pd.util.hash_pandas_object(df[cols], index=False)
+
+
+def summary_prompt_append(agg_cols):
+    # Also used at the topic x Guide grain, so Guide rollups that reuse a
+    # single topic x Guide summary already follow the Guide-level wording
+    if 'Guide' in ([agg_cols] if isinstance(agg_cols, str) else agg_cols):
+        return "You are summarizing feedback for this Guide across multiple Seminars or Wonder Sessions, so do not reference a single 'seminar' or 'session' but instead talk about multiple 'sessions' or 'feedback' in general."
+    return ""
+
+
+def qual_summary(df, agg_cols, state=None, scope='', incremental_update=False, max_workers=8,
+                 example_index=None):
+    """
+    LLM summary of the qualitative feedback of each group.
+
+    Groups are summarized concurrently (up to max_workers requests, paced by
+    the shared rate limiter); results keep the groupby order.
+
+    With a GroupSummaryState, groups whose feedback rows are unchanged since
+    the last run reuse the stored summary (`scope` keeps e.g. Seminar and
+    Wonder Session groups apart). With incremental_update=True, groups that
+    only gained rows are summarized from the previous summary plus the new texts.
+    With a FewShotIndex, each prompt gets the expert examples closest to its texts.
+    """
     cols_qual_avail = [col for col in cols_qual if col in df.columns]
 
     summarizer = SimpleTextSummarizer()
-    if agg_cols == 'Guide':
-        prompt_append = "You are summarizing feedback for this Guide across multiple Seminars or Wonder Sessions, so do not reference a single 'seminar' or 'session' but instead talk about multiple 'sessions' or 'feedback' in general."
-    else:
-        prompt_append = ""
-    agg_df = df.groupby(agg_cols, dropna=False).apply(
-        lambda group: summarizer.summarize_texts(text_list, prompt_append) if (
-            text_list := group[cols_qual_avail].stack().dropna().tolist()) else ''
-    ).reset_index(name='qual_summary_by_llm')
+    if example_index is not None:
+        summarizer.set_example_index(example_index)
+    prompt_append = summary_prompt_append(agg_cols)
+    # Stored summaries are only reused if the prompt, examples and model settings match
+    prompt_hash = summarizer.settings_hash(prompt_append)
+    row_ids = feedback_row_ids(df)
+
+    # Decide per group whether it needs a request; jobs run afterwards in parallel
+    grouped = df.groupby(agg_cols, dropna=False, observed=True)
+    summaries, jobs = [], []
+    reused = updated = 0
+    for group_key, group in grouped:
+        texts = group[cols_qual_avail].stack().dropna()
+        if texts.empty:
+            summaries.append('')
+            continue
+        text_ids = row_ids.loc[texts.index.get_level_values(0)].tolist()
+        key = group_ids = None
+        if state is not None:
+            key = state.key(scope, agg_cols, group_key)
+            group_ids = sorted(set(text_ids))
+            previous = state.get(key)
+            same_prompt = previous is not None and previous['prompt'] == prompt_hash
+            unchanged = same_prompt and previous['fingerprint'] == state.fingerprint(group_ids)
+            telemetry.record_cache('summary_state', unchanged)
+            if unchanged:
+                summaries.append(previous['summary'])
+                reused += 1
+                continue
+            if incremental_update and same_prompt and set(previous['row_ids']) <= set(group_ids):
+                seen = set(previous['row_ids'])
+                new_texts = [text for text, row_id in zip(texts, text_ids) if row_id not in seen]
+                jobs.append((len(summaries), key, group_ids, summarizer.update_summary,
+                             (previous['summary'], new_texts, prompt_append)))
+                summaries.append(None)
+                updated += 1
+                continue
+        jobs.append((len(summaries), key, group_ids, summarizer.summarize_texts,
+                     (texts.tolist(), prompt_append)))
+        summaries.append(None)
+
+    if jobs:
+        print(f"   🧠 Summarizing {len(jobs)} groups ({max_workers} at a time)...")
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(lambda job: job[3](*job[4]), jobs))
+        for (position, key, group_ids, _, _), summary in zip(jobs, results):
+            summaries[position] = summary
+            if state is not None and not summary.startswith("Error:"):
+                state.record(key, group_ids, prompt_hash, summary)
+
+    agg_df = pd.Series(summaries, index=grouped.size().index).reset_index(name='qual_summary_by_llm')
+    summarizer.flush_cache()
+    if state is not None:
+        state.flush()
+        print(f"   ♻️  {reused} unchanged groups reused, {updated} updated incrementally")
+    print(f"   🗂️  Summary cache: {summarizer.cache_stats()}")
     print(agg_df)
     return agg_df
 
 
-def all_feedback_combined(df, agg_cols):
+def rollup_qual_summary(qual, agg_cols, max_workers=8):
+    """
+    Roll finer-grained qual summaries up to agg_cols by summarizing the
+    summaries of each group. A group with one summary keeps it as is,
+    without a call.
+    """
+    summarizer = SimpleTextSummarizer()
+    prompt_append = summary_prompt_append(agg_cols)
+
+    grouped = qual.groupby(agg_cols, dropna=False, observed=True)
+    summaries, jobs = [], []
+    for _, group in grouped:
+        children = [summary for summary in group['qual_summary_by_llm']
+                    if summary and not summary.startswith("Error:")]
+        if len(children) > 1:
+            jobs.append((len(summaries), children))
+        summaries.append(children[0] if children else '')
+
+    if jobs:
+        print(f"   🧠 Rolling up {len(jobs)} groups from {len(qual)} summaries ({max_workers} at a time)...")
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(
+                lambda job: summarizer.merge_summaries(job[1], prompt_append), jobs))
+        for (position, _), summary in zip(jobs, results):
+            summaries[position] = summary
+
+    agg_df = pd.Series(summaries, index=grouped.size().index).reset_index(name='qual_summary_by_llm')
+    summarizer.flush_cache()
+    return agg_df
+
+
+def all_feedback_combined(df, agg_cols, **kwargs):
     stats = quant_summary(df, agg_cols)
-    qual = qual_summary(df, agg_cols)
+    qual = qual_summary(df, agg_cols, **kwargs)
     merged_df = pd.merge(stats, qual, on=agg_cols, how='left')
     return merged_df
 
 
+def hierarchical_summaries(df, **kwargs):
+    """
+    Topic x Guide, Guide and topic level summaries from a single pass at the
+    topic x Guide grain.
+
+    Quant rollups are exact (summed sums and counts); qual rollups summarize
+    the topic x Guide summaries. Returns {'topic_guide', 'guide', 'topic'}
+    frames shaped like all_feedback_combined.
+    """
+    fine_cols = ['matched_topic', 'Guide']
+    stats = quant_stats(df, fine_cols)
+    qual = qual_summary(df, fine_cols, **kwargs)
+
+    levels = {'topic_guide': pd.merge(quant_summary_from_stats(stats, fine_cols), qual,
+                                      on=fine_cols, how='left')}
+    for level, agg_cols in (('guide', 'Guide'), ('topic', 'matched_topic')):
+        level_quant = quant_summary_from_stats(rollup_quant_stats(stats, agg_cols), agg_cols)
+        level_qual = rollup_qual_summary(qual, agg_cols, kwargs.get('max_workers', 8))
+        levels[level] = pd.merge(level_quant, level_qual, on=agg_cols, how='left')
+    return levels
+
+
 def correlation_analysis(df):
     cols_quant_avail = [col for col in cols_quant if col in df.columns]
     corr_matrix = df[cols_quant_avail].corr()
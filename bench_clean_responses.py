@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark read_responses.clean_responses against the previous implementation
+on a synthetic frame shaped like get_all_records() output.
+
+Usage: python bench_clean_responses.py [n_rows]
+"""
+
+import contextlib
+import io
+import sys
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from read_responses import clean_responses, identify_topics
+
+GUIDES = ['Ada Lovelace', 'Alan Turing', 'Grace Hopper', 'N/A', 'Katherine Johnson']
+TOPICS = ['Black Holes', 'Volcanoes', 'Origami', 'Cryptography', 'Ancient Rome']
+LIKERT = ['I felt comfortable as a student in this Seminar.',
+          'I felt like my voice mattered in this Seminar.',
+          'I felt like I could connect with the Guide as a person.',
+          'The content of the Seminar was interesting to me.',
+          'I learned a lot from the Seminar.',
+          'How much fun did you have?',
+          'Did it leave you wanting to learn more about this topic?']
+
+
+def make_responses(n_rows, seed=0):
+    """Synthetic sheet records: Likert ints with blanks, free text with whitespace-only cells."""
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp(2024, 9, 1).value
+    end = pd.Timestamp(2026, 6, 1).value
+    timestamps = pd.to_datetime(rng.integers(start, end, n_rows))
+    df = pd.DataFrame({'Timestamp': timestamps.strftime('%m/%d/%Y %H:%M:%S')})
+    for col in LIKERT:
+        values = pd.Series(rng.integers(1, 11, n_rows), dtype=object)
+        values[rng.random(n_rows) < 0.05] = ''
+        df[col] = values
+    df['What was the name of the Guide who delivered your Seminar?'] = rng.choice(GUIDES, n_rows)
+    df['What was your Seminar topic?'] = rng.choice(TOPICS, n_rows)
+    df['Let us know if you have more thoughts or feedback!'] = rng.choice(
+        ['Loved it', '', '   ', 'Too fast'], n_rows)
+    df['Unused question'] = ''
+    return df
+
+
+def legacy_clean_responses(df):
+    """clean_responses as it was before the single-pass rewrite."""
+    df['Timestamp'] = pd.to_datetime(df['Timestamp'], errors='coerce')
+    df['year-week'] = df['Timestamp'].dt.strftime('%Y-%W')
+    df['week_start'] = pd.to_datetime(
+        df['year-week'] + '-1', format='%Y-%W-%w')
+
+    cols_to_scale = LIKERT[:4]
+    cols_to_scale = [col for col in cols_to_scale if col in df.columns]
+    df[cols_to_scale] = df[cols_to_scale].apply(pd.to_numeric, errors='coerce')
+    df.loc[df['Timestamp'] < datetime(
+        2025, 8, 13), cols_to_scale] = df.loc[df['Timestamp'] < datetime(2025, 8, 13), cols_to_scale]*2
+
+    guide_col = 'What was the name of the Guide who delivered your Seminar?'
+    if guide_col in df.columns:
+        df.loc[(df['Timestamp'] < datetime(2025, 8, 20)) & (
+            df[guide_col] == 'N/A'), guide_col] = "Megan Hanley"
+
+    df = df.replace(r'^\s*$', pd.NA, regex=True)
+    df = df.dropna(axis=1, how='all')
+
+    cols_quant = [col for col in LIKERT if col in df.columns]
+    df[cols_quant] = df[cols_quant].apply(pd.to_numeric, errors='coerce')
+    df = df.astype({col: 'Int64' for col in cols_quant})
+    print(df[cols_quant].describe())
+
+    df['Guide'] = df['What was the name of the Guide who delivered your Seminar?']
+    print(df.columns)
+    return identify_topics(df)
+
+
+def time_clean(clean, raw):
+    """Run a cleaning function on a copy of raw, returning (seconds, result)."""
+    df = raw.copy()
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = clean(df)
+        elapsed = time.perf_counter() - start
+    return elapsed, result
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(f"Generating {n_rows:,} synthetic responses...")
+    raw = make_responses(n_rows)
+
+    legacy_time, legacy = time_clean(legacy_clean_responses, raw)
+    new_time, new = time_clean(clean_responses, raw)
+
+    # Same cleaned values, column for column
+    compare_cols = ['Timestamp', 'year-week', 'Guide', 'topic'] + LIKERT
+    for col in compare_cols:
+        pd.testing.assert_series_equal(new[col], legacy[col], check_dtype=False)
+    # pandas parses some '%Y-00' weeks to Jan 1 rather than the preceding Monday
+    full_weeks = ~legacy['year-week'].str.endswith('-00')
+    pd.testing.assert_series_equal(new.loc[full_weeks, 'week_start'],
+                                   legacy.loc[full_weeks, 'week_start'], check_dtype=False)
+    assert sorted(new.columns) == sorted(legacy.columns)
+
+    print(f"legacy clean_responses: {legacy_time:.2f}s")
+    print(f"clean_responses:        {new_time:.2f}s")
+    print(f"speedup:                {legacy_time / new_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Iterator, Optional, Tuple
+
+
+class JsonCacheStore:
+    """
+    Dict-like cache kept in memory and written to a JSON file.
+
+    Writes are batched (every `flush_every` writes or `flush_interval`
+    seconds) and each flush atomically replaces the file. Not safe for
+    several processes writing at once; use SQLiteCacheStore for that.
+    With `max_entries`, the least recently used entries are evicted on flush.
+    """
+
+    def __init__(self, path: str, flush_every: int = 50, flush_interval: float = 5.0,
+                 max_entries: Optional[int] = None):
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.max_entries = max_entries
+        self._data = {}
+        self._dirty = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.RLock()
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    self._data = json.load(f)
+            except Exception as e:
+                print(f"Warning: Could not load cache file: {e}")
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            if self.max_entries is not None and key in self._data:
+                # Dict order doubles as recency order
+                self._data[key] = self._data.pop(key)
+            return self._data.get(key, default)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __getitem__(self, key: str) -> Any:
+        with self._lock:
+            return self._data[key]
+
+    def __setitem__(self, key: str, value: Any):
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            self._dirty += 1
+            if (self._dirty >= self.flush_every
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self.flush()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        with self._lock:
+            return iter(list(self._data.items()))
+
+    def flush(self):
+        """Atomically write the cache to disk if anything changed."""
+        with self._lock:
+            if self.max_entries is not None and len(self._data) > self.max_entries:
+                for key in list(self._data)[:len(self._data) - self.max_entries]:
+                    del self._data[key]
+                self._dirty += 1
+            if self._dirty:
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump(self._data, f)
+                os.replace(tmp_path, self.path)
+                self._dirty = 0
+            self._last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+
+
+class SQLiteCacheStore:
+    """
+    Dict-like cache backed by a SQLite table with JSON-encoded values.
+
+    Inserts are O(1): writes are buffered and committed in one transaction
+    every `flush_every` writes or `flush_interval` seconds (and on flush /
+    close). WAL mode plus a busy timeout lets several pipeline processes
+    share one cache file; a lock makes an instance safe to share across threads.
+
+    With `max_entries`, reads refresh an entry's timestamp and the least
+    recently used entries beyond the limit are deleted on flush.
+    """
+
+    def __init__(self, path: str, table: str = 'cache', flush_every: int = 50,
+                 flush_interval: float = 5.0, max_entries: Optional[int] = None):
+        self.path = path
+        self.table = table
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.max_entries = max_entries
+        self._pending = {}
+        self._touched = set()
+        self._last_flush = time.monotonic()
+        self._lock = threading.RLock()
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, updated_at REAL NOT NULL)")
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            if key in self._pending:
+                return self._pending[key]
+            row = self._conn.execute(
+                f"SELECT value FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row and self.max_entries is not None:
+                self._touched.add(key)
+        return json.loads(row[0]) if row else default
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: Any):
+        with self._lock:
+            self._pending[key] = value
+            if (len(self._pending) >= self.flush_every
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self.flush()
+
+    def __len__(self) -> int:
+        self.flush()
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute(f"SELECT key, value FROM {self.table}").fetchall()
+        return ((key, json.loads(value)) for key, value in rows)
+
+    def flush(self):
+        """Commit buffered writes (and LRU bookkeeping) in a single transaction."""
+        with self._lock:
+            if self._pending or self._touched:
+                now = time.time()
+                with self._conn:
+                    self._conn.executemany(
+                        f"UPDATE {self.table} SET updated_at = ? WHERE key = ?",
+                        [(now, key) for key in self._touched if key not in self._pending])
+                    self._conn.executemany(
+                        f"INSERT OR REPLACE INTO {self.table} (key, value, updated_at) VALUES (?, ?, ?)",
+                        [(key, json.dumps(value), now) for key, value in self._pending.items()])
+                    if self.max_entries is not None and self._pending:
+                        self._conn.execute(
+                            f"DELETE FROM {self.table} WHERE key IN (SELECT key FROM {self.table} "
+                            "ORDER BY updated_at DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+                self._pending.clear()
+                self._touched.clear()
+            self._last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+    def migrate_json(self, json_path: str) -> int:
+        """
+        Import entries from a legacy JSON cache file not already in the store.
+
+        Returns:
+            int: Number of entries imported
+        """
+        if not os.path.exists(json_path):
+            return 0
+        try:
+            with open(json_path, 'r') as f:
+                legacy = json.load(f)
+        except Exception as e:
+            print(f"Warning: Could not read legacy cache {json_path}: {e}")
+            return 0
+
+        now = time.time()
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                f"INSERT OR IGNORE INTO {self.table} (key, value, updated_at) VALUES (?, ?, ?)",
+                [(key, json.dumps(value), now) for key, value in legacy.items()])
+            imported = self._conn.total_changes - before
+        return imported
+
+
+_MISSING = object()
+
+
+def open_cache_store(path: str, legacy_json: Optional[str] = None, **kwargs):
+    """
+    Open a cache store, choosing the backend from the file extension
+    (.json -> JsonCacheStore, anything else -> SQLiteCacheStore).
+
+    A legacy JSON cache is migrated into a new, empty SQLite store.
+    """
+    if path.endswith('.json'):
+        return JsonCacheStore(path, **kwargs)
+    store = SQLiteCacheStore(path, **kwargs)
+    if legacy_json and len(store) == 0:
+        imported = store.migrate_json(legacy_json)
+        if imported:
+            print(f"   📦 Migrated {imported} cache entries from {legacy_json} to {path}")
+    return store
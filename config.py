@@ -17,6 +17,37 @@ SCOPES = [
 FORM_ID = os.getenv('FORM_ID')
 # Optional: if responses go to a sheet
 SPREADSHEET_ID = os.getenv('SPREADSHEET_ID')
+# Per-form high-water marks for incremental response syncs
+SYNC_STATE_FILE = os.getenv('SYNC_STATE_FILE', 'form_sync_state.json')
+# Form question schemas, keyed by form revisionId
+FORM_SCHEMA_CACHE_FILE = os.getenv('FORM_SCHEMA_CACHE_FILE', 'form_schema_cache.json')
+
+# Response sheets ingested by main.py, fetched concurrently
+FEEDBACK_SHEETS = {
+    'seminar': "Seminar Feedback (Responses)",
+    'wonder': "Wonder Session Feedback (Responses)",
+}
+INGEST_MAX_WORKERS = int(os.getenv('INGEST_MAX_WORKERS', 4))
+
+# Local Parquet store of sheet responses
+RESPONSE_STORE_DIR = os.getenv("RESPONSE_STORE_DIR", "data/responses")
+
+# Planning-sheet snapshot, reused for REFERENCE_TTL_SECONDS before revalidating
+REFERENCE_SNAPSHOT_DIR = os.getenv("REFERENCE_SNAPSHOT_DIR", "data/reference_topics")
+REFERENCE_TTL_SECONDS = float(os.getenv("REFERENCE_TTL_SECONDS", 6 * 3600))
+
+# Responses are matched against topics scheduled within this many weeks
+TOPIC_WEEK_WINDOW = int(os.getenv("TOPIC_WEEK_WINDOW", 1))
+
+# Per-group record of the feedback rows each qualitative summary covers
+SUMMARY_STATE_FILE = os.getenv("SUMMARY_STATE_FILE", "data/summary_state.sqlite")
+# Update changed group summaries from the previous summary plus new feedback only
+INCREMENTAL_SUMMARIES = os.getenv("INCREMENTAL_SUMMARIES", "false").lower() == "true"
+# Group summaries requested concurrently
+SUMMARY_MAX_WORKERS = int(os.getenv("SUMMARY_MAX_WORKERS", 8))
+
+# Expert-written example summaries used as few-shot examples (optional)
+FEW_SHOT_EXAMPLES_FILE = os.getenv("FEW_SHOT_EXAMPLES_FILE", "input/few_shot_examples.csv")
 
 # Output settings
 OUTPUT_DIR = "output"
@@ -0,0 +1,78 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, List, Optional
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class CorrectionRule:
+    """
+    A historical data correction: rows submitted in [start, end) that also
+    satisfy `where` get `transform` applied to each of `columns`.
+    """
+    name: str
+    columns: List[str]
+    transform: Callable[[pd.Series], pd.Series]
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    where: Optional[Callable[[pd.DataFrame], pd.Series]] = None
+
+    def mask(self, df: pd.DataFrame) -> np.ndarray:
+        """Vectorized mask of the rows this rule applies to."""
+        mask = np.ones(len(df), dtype=bool)
+        if self.start is not None:
+            mask &= (df['Timestamp'] >= self.start).to_numpy()
+        if self.end is not None:
+            mask &= (df['Timestamp'] < self.end).to_numpy()
+        if self.where is not None and mask.any():
+            mask &= self.where(df).fillna(False).to_numpy(dtype=bool)
+        return mask
+
+
+def scale_by(factor):
+    return lambda values: values * factor
+
+
+def set_value(value):
+    return lambda values: pd.Series(value, index=values.index, dtype=object)
+
+
+SEMINAR_GUIDE_COL = 'What was the name of the Guide who delivered your Seminar?'
+
+CORRECTION_RULES = [
+    # Scale answered on base-5 before Aug 13, 2025; rescale to base-10
+    CorrectionRule(
+        name='rescale_base5_to_base10',
+        columns=['I felt comfortable as a student in this Seminar.',
+                 'I felt like my voice mattered in this Seminar.',
+                 'I felt like I could connect with the Guide as a person.',
+                 'The content of the Seminar was interesting to me.'],
+        transform=scale_by(2),
+        end=datetime(2025, 8, 13)),
+    # "N/A" Guide on Seminars before Aug 20, 2025 were delivered by Megan Hanley
+    CorrectionRule(
+        name='attribute_na_guide_to_megan_hanley',
+        columns=[SEMINAR_GUIDE_COL],
+        transform=set_value("Megan Hanley"),
+        end=datetime(2025, 8, 20),
+        where=lambda df: df[SEMINAR_GUIDE_COL] == 'N/A'),
+]
+
+
+def apply_rules(df: pd.DataFrame, rules: List[CorrectionRule] = CORRECTION_RULES) -> pd.DataFrame:
+    """
+    Apply correction rules to df in place.
+
+    Each rule is one vectorized mask over the frame, so the cost is a few
+    column comparisons per rule rather than a pass per row.
+    """
+    for rule in rules:
+        columns = [col for col in rule.columns if col in df.columns]
+        if not columns:
+            continue
+        apply_mask = rule.mask(df)
+        if apply_mask.any():
+            for col in columns:
+                df.loc[apply_mask, col] = rule.transform(df.loc[apply_mask, col])
+    return df
@@ -1,5 +1,10 @@
+import hashlib
+import json
+import numpy as np
 import pandas as pd
-from typing import List, Dict
+from typing import List, Dict, Optional
+from rate_limiter import count_tokens
+from text_similarity import TfidfIndex, word_ngrams
 
 cols_positive = ["What did you find most effective or enjoyable about the Guide and the Seminar they facilitated?",
                  "What is your impression of this Guide? Feel free to use 2-4 words (or phrases) to describe them.",
@@ -22,45 +27,138 @@ def combine_few_shot_examples(examples_df: pd.DataFrame, feedback_df: pd.DataFra
     cols_constructive_avail = [
         col for col in cols_constructive if col in feedback_df.columns]
 
-    # Reshape examples so we have separate cols for positive & constructive feedback
-    examples_reshaped_df = examples_df.pivot_table(
-        index=['Guide', 'date_max'],  # Group by Guide and date
-        columns='feedback_type',
-        values='feedback_summary',
-        # Join multiple feedback summaries with separator
-        aggfunc=lambda x: ' | '.join(x)
-    ).reset_index()
-
-    # Clean up column names
-    # Remove the 'feedback_type' name from columns
-    examples_reshaped_df.columns.name = None
-    examples_reshaped_df.columns = [
-        'Guide', 'date_max', 'constructive_feedback_summary', 'positive_feedback_summary']
-
-    # Merge 2 datasets w/ fake 2nd column
-    feedback_df['temp'] = 'A'
-    examples_reshaped_df['temp'] = 'B'
-    combined_df = pd.merge(feedback_df, examples_reshaped_df, on=[
-                           'Guide', 'temp'], how='outer')
-
-    combined_df.dropna(subset=['Guide'], inplace=True)
-    combined_df = combined_df[combined_df['Guide'] != 'N/A']
-
-    cols_to_keep = (cols_positive_avail+cols_constructive_avail +
-                    ['date_max', 'constructive_feedback_summary', 'positive_feedback_summary'])
-
-    feedback = combined_df.groupby('Guide').agg(
-        {col: lambda x: x.dropna().tolist() for col in cols_to_keep}).reset_index()
-    feedback['positive_texts'] = feedback[cols_positive_avail].sum(
-        axis=1)
-    feedback['constructive_texts'] = feedback[cols_constructive_avail].sum(
-        axis=1)
-    feedback_examples = feedback[[
+    # One row per Guide and date, with positive & constructive summaries side by side
+    summaries = (examples_df.groupby(['Guide', 'date_max', 'feedback_type'])['feedback_summary']
+                 .agg(' | '.join).unstack('feedback_type')
+                 .reindex(columns=['constructive', 'positive'])
+                 .add_suffix('_feedback_summary').reset_index())
+    summaries.columns.name = None
+
+    # Per-Guide lists of example summaries and dates
+    example_lists = summaries.groupby('Guide').agg(
+        {col: list for col in ['date_max', 'constructive_feedback_summary', 'positive_feedback_summary']})
+    example_lists = example_lists.apply(lambda col: col.map(
+        lambda values: [value for value in values if pd.notna(value)]))
+
+    def texts_by_guide(cols):
+        # Column by column, so texts keep the order of the original list concatenation
+        texts = feedback_df.melt(id_vars='Guide', value_vars=cols, value_name='text')
+        texts = texts.dropna(subset=['Guide', 'text'])
+        # Stable sort by Guide and split the text array at the group boundaries
+        codes, guides = pd.factorize(texts['Guide'])
+        values = texts['text'].to_numpy(dtype=object)[np.argsort(codes, kind='stable')]
+        bounds = np.cumsum(np.bincount(codes, minlength=len(guides)))[:-1]
+        return pd.Series([chunk.tolist() for chunk in np.split(values, bounds)],
+                         index=pd.Index(guides, dtype=object), dtype=object)
+
+    guides = pd.Index(feedback_df['Guide'].dropna().unique()).union(
+        pd.Index(summaries['Guide'].dropna().unique()))
+    guides = guides[guides != 'N/A']
+
+    feedback = pd.DataFrame(index=pd.Index(guides, name='Guide'))
+    feedback['positive_texts'] = texts_by_guide(cols_positive_avail)
+    feedback['constructive_texts'] = texts_by_guide(cols_constructive_avail)
+    feedback = feedback.join(example_lists)
+    # Guides missing on one side get empty lists
+    feedback = feedback.apply(lambda col: col.map(lambda value: value if isinstance(value, list) else []))
+    feedback_examples = feedback.reset_index()[[
         'Guide', 'positive_texts', 'constructive_texts', 'constructive_feedback_summary', 'positive_feedback_summary', 'date_max']].to_dict('records')
 
     return feedback_examples
 
 
+def to_expert_examples(feedback_examples: List[Dict]) -> List[Dict]:
+    """
+    Turn combined examples into the summarizer's few-shot format,
+    {"texts": [...], "summary": "..."}, one per Guide and feedback type.
+    """
+    expert_examples = []
+    for example in feedback_examples:
+        for feedback_type in ['positive', 'constructive']:
+            texts = example[f'{feedback_type}_texts']
+            summaries = example[f'{feedback_type}_feedback_summary']
+            if texts and summaries:
+                expert_examples.append({"texts": texts, "summary": " | ".join(summaries)})
+    return expert_examples
+
+
+class FewShotIndex:
+    """
+    Word n-gram TF-IDF index over expert examples that picks, for a group of
+    texts, the k most similar examples that fit in a token budget, so prompt
+    size stays constant however many examples there are.
+
+    Examples are matched on all of their texts, but the texts shown in the
+    prompt are capped at build time so that each example fits in
+    token_budget // k; examples whose summary alone is too long are dropped.
+    """
+
+    def __init__(self, expert_examples: List[Dict], k: int = 3, token_budget: int = 1500):
+        self.k = k
+        self.token_budget = token_budget
+        # Stable across runs: new feedback texts don't change it, new expert summaries do
+        self.identity = hashlib.sha1(json.dumps({
+            "summaries": [example["summary"] for example in expert_examples],
+            "k": k,
+            "token_budget": token_budget,
+        }).encode('utf-8')).hexdigest()
+
+        per_example = token_budget // k
+        self.examples, self.tokens, documents = [], [], []
+        trimmed = dropped = 0
+        for example in expert_examples:
+            texts = self._cap_texts(example, per_example)
+            if texts is None:
+                dropped += 1
+                continue
+            trimmed += len(texts) < len(example["texts"])
+            self.examples.append({**example, "texts": texts})
+            self.tokens.append(self._prompt_tokens(texts, example["summary"]))
+            documents.append(" ".join(example["texts"]))
+        if trimmed or dropped:
+            print(f"    ⚠️  Few-shot examples over {per_example} tokens: {trimmed} trimmed, "
+                  f"{dropped} dropped (summary alone too long)")
+        self.index = TfidfIndex(documents, analyzer=word_ngrams)
+
+    @staticmethod
+    def _prompt_tokens(texts: List[str], summary: str) -> int:
+        """Tokens an example takes up in the prompt"""
+        return count_tokens("\n".join(f"- {text}" for text in texts)
+                            + f"\nExpert Summary: {summary}") + 10
+
+    def _cap_texts(self, example: Dict, budget: int) -> Optional[List[str]]:
+        """The example's texts, in order, skipping those that would exceed budget (None if nothing fits)"""
+        used = self._prompt_tokens([], example["summary"])
+        if used > budget:
+            return None
+        texts = []
+        for text in example["texts"]:
+            tokens = count_tokens(f"- {text}") + 1
+            if used + tokens <= budget:
+                texts.append(text)
+                used += tokens
+        # Token counts of joined lines can differ slightly from the sum of their parts
+        while texts and self._prompt_tokens(texts, example["summary"]) > budget:
+            texts.pop()
+        return texts
+
+    def select(self, texts: List[str]) -> List[Dict]:
+        """The most similar examples to texts, best first, within k and the token budget"""
+        if not texts or not self.examples:
+            return []
+        scores = self.index.similarities([" ".join(texts)])[0]
+        selected, used = [], 0
+        for i in np.argsort(-scores, kind='stable'):
+            if len(selected) == self.k:
+                break
+            if used + self.tokens[i] <= self.token_budget:
+                selected.append(self.examples[i])
+                used += self.tokens[i]
+        if not selected:
+            print(f"    ⚠️  No few-shot example fits the {self.token_budget}-token budget")
+        return selected
+
+
 def prepare_few_shot_examples(file_path: str, feedback_df: pd.DataFrame) -> List[Dict]:
     examples_df = read_few_shot_examples(file_path)
     examples_dict = combine_few_shot_examples(examples_df, feedback_df)
@@ -1,5 +1,8 @@
 import pandas as pd
+import json
+import os
 from datetime import datetime
+from itertools import zip_longest
 import auth
 import config
 
@@ -26,52 +29,147 @@ class FormsClient:
             print(f"Error getting form info: {e}")
             return None
 
-    def get_responses(self, form_id):
-        """Get all responses from the form."""
+    def get_responses(self, form_id, incremental=False):
+        """
+        Get responses from the form, following every page of results.
+
+        Args:
+            form_id: ID of the Google Form
+            incremental: If True, only fetch responses submitted after the
+                form's stored high-water mark
+
+        Returns:
+            DataFrame: One row per response. With incremental=True, a
+            (DataFrame, mark) tuple instead; pass the mark to commit_sync()
+            once the rows have been stored, so a failure before then
+            re-fetches them on the next run.
+        """
         if not self.forms_service:
-            return []
+            return (pd.DataFrame(), None) if incremental else []
 
         try:
-            # Get form structure first
-            form = self.forms_service.forms().get(formId=form_id).execute()
+            # Get form structure first (cached until the form is edited)
+            schema = self._get_form_schema(form_id)
 
             # Get responses
-            response = self.forms_service.forms().responses().list(formId=form_id).execute()
-            responses = response.get('responses', [])
+            last_synced = self._load_json(config.SYNC_STATE_FILE).get(form_id) if incremental else None
+            responses = self._list_responses(form_id, since=last_synced)
 
-            print(f"Found {len(responses)} responses")
-            return self._process_responses(form, responses)
+            if last_synced:
+                print(f"Found {len(responses)} new responses since {last_synced}")
+            else:
+                print(f"Found {len(responses)} responses")
+            df = self._process_responses(schema, responses)
+
+            if not incremental:
+                return df
+            mark = max((r['lastSubmittedTime'] for r in responses if r.get('lastSubmittedTime')),
+                       key=pd.Timestamp, default=last_synced)
+            return df, mark
 
         except Exception as e:
             print(f"Error getting responses: {e}")
-            return []
+            return (pd.DataFrame(), None) if incremental else []
+
+    def commit_sync(self, form_id, mark):
+        """Advance the form's high-water mark after the responses up to it have been stored."""
+        if not mark:
+            return
+        sync_state = self._load_json(config.SYNC_STATE_FILE)
+        sync_state[form_id] = mark
+        self._save_json(config.SYNC_STATE_FILE, sync_state)
+
+    def _list_responses(self, form_id, since=None, page_size=5000):
+        """List responses across all pages, optionally only those submitted after `since`."""
+        request_args = {'formId': form_id, 'pageSize': page_size}
+        if since:
+            request_args['filter'] = f"timestamp > {since}"
+
+        responses_api = self.forms_service.forms().responses()
+        request = responses_api.list(**request_args)
+        responses = []
+        while request is not None:
+            page = request.execute()
+            responses.extend(page.get('responses', []))
+            request = responses_api.list_next(request, page)
+        return responses
+
+    def _get_form_schema(self, form_id):
+        """
+        Get the question schema of a form, cached on disk by revisionId.
+
+        Only the form's revisionId is requested when a cached schema exists;
+        the full form is fetched again only after it has been edited.
+        """
+        schema_cache = self._load_json(config.FORM_SCHEMA_CACHE_FILE)
+        cached = schema_cache.get(form_id)
+        if cached:
+            revision = self.forms_service.forms().get(
+                formId=form_id, fields='revisionId').execute().get('revisionId')
+            if revision and revision == cached['revision_id']:
+                return cached
 
-    def get_responses_from_sheet(self, spreadsheet_id, sheet_range='Form Responses 1'):
-        """Alternative: Get responses from the linked Google Sheet."""
+        form = self.forms_service.forms().get(formId=form_id).execute()
+        schema = {'revision_id': form.get('revisionId'), 'questions': {}}
+        for item in form.get('items', []):
+            if 'questionItem' in item:
+                question = item['questionItem']['question']
+                schema['questions'][question['questionId']] = {
+                    'title': item['title'], 'kind': self._question_kind(question)}
+            elif 'questionGroupItem' in item:
+                # Grid questions: one column per row of the grid
+                for question in item['questionGroupItem'].get('questions', []):
+                    row_title = question.get('rowQuestion', {}).get('title', '')
+                    schema['questions'][question['questionId']] = {
+                        'title': f"{item['title']} [{row_title}]", 'kind': 'text'}
+
+        schema_cache[form_id] = schema
+        self._save_json(config.FORM_SCHEMA_CACHE_FILE, schema_cache)
+        return schema
+
+    @staticmethod
+    def _question_kind(question):
+        """Classify a question as 'scale' (numeric answers) or 'text'."""
+        if 'scaleQuestion' in question or 'ratingQuestion' in question:
+            return 'scale'
+        return 'text'
+
+    def _load_json(self, path):
+        """Load a JSON state file, returning {} if missing or unreadable."""
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Warning: Could not load {path}: {e}")
+            return {}
+
+    def _save_json(self, path, data):
+        """Atomically write a JSON state file."""
+        tmp_file = f"{path}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_file, path)
+
+    def get_responses_from_sheet(self, spreadsheet_id, sheet_title='Form Responses 1', chunk_rows=5000):
+        """Alternative: Get responses from the linked Google Sheet (a worksheet title, not an A1 range)."""
         if not self.sheets_service:
             return pd.DataFrame()
 
         try:
-            result = self.sheets_service.spreadsheets().values().get(
-                spreadsheetId=spreadsheet_id,
-                range=sheet_range
-            ).execute()
-
-            values = result.get('values', [])
-            if not values:
+            headers = self._get_sheet_headers(spreadsheet_id, sheet_title)
+            if not headers:
                 print("No data found in sheet")
                 return pd.DataFrame()
-            # print(values)
 
-            headers = values[0]
-            print(len(headers))
-            data_rows = values[1:]
-            print(data_rows[1])
-            print(len(data_rows[1]))
-            print(len(data_rows))
+            # Extend per-column lists chunk by chunk instead of holding every row
+            columns = [[] for _ in headers]
+            for rows in self._iter_sheet_rows(spreadsheet_id, sheet_title, len(headers), chunk_rows):
+                for column, values in zip(columns, self._rows_to_columns(rows, len(headers))):
+                    column.extend(values)
 
-            # Convert to DataFrame
-            df = pd.DataFrame(values[1:], columns=values[0])
+            df = self._columns_to_frame(headers, columns)
             print(f"Found {len(df)} responses in sheet")
             return df
 
@@ -79,44 +177,125 @@ class FormsClient:
             print(f"Error getting sheet data: {e}")
             return pd.DataFrame()
 
-    def _process_responses(self, form, responses):
+    def iter_responses_from_sheet(self, spreadsheet_id, sheet_title='Form Responses 1', chunk_rows=5000):
+        """Stream responses from the linked Google Sheet as DataFrame chunks of up to chunk_rows rows."""
+        if not self.sheets_service:
+            return
+
+        headers = self._get_sheet_headers(spreadsheet_id, sheet_title)
+        if not headers:
+            return
+        for rows in self._iter_sheet_rows(spreadsheet_id, sheet_title, len(headers), chunk_rows):
+            yield self._columns_to_frame(headers, self._rows_to_columns(rows, len(headers)))
+
+    def _get_sheet_headers(self, spreadsheet_id, sheet_title):
+        """Read the header row of the responses sheet."""
+        result = self.sheets_service.spreadsheets().values().get(
+            spreadsheetId=spreadsheet_id,
+            range=f"'{sheet_title}'!1:1"
+        ).execute()
+        values = result.get('values', [])
+        return values[0] if values else []
+
+    def _get_sheet_row_count(self, spreadsheet_id, sheet_title):
+        """Number of rows in the sheet's grid; reads past it are rejected by the API."""
+        result = self.sheets_service.spreadsheets().get(
+            spreadsheetId=spreadsheet_id, fields='sheets.properties').execute()
+        for sheet in result.get('sheets', []):
+            properties = sheet.get('properties', {})
+            if properties.get('title') == sheet_title:
+                return properties.get('gridProperties', {}).get('rowCount', 0)
+        raise ValueError(f"Sheet '{sheet_title}' not found in spreadsheet {spreadsheet_id}")
+
+    def _iter_sheet_rows(self, spreadsheet_id, sheet_title, n_cols, chunk_rows, ranges_per_request=4):
+        """
+        Yield data rows in row-range chunks, several ranges per batchGet call.
+
+        Ranges stop at the sheet's grid size. Values are requested
+        UNFORMATTED so numbers arrive typed; timestamps are kept as formatted
+        strings rather than serial numbers.
+        """
+        row_count = self._get_sheet_row_count(spreadsheet_id, sheet_title)
+        start_row = 2
+        while start_row <= row_count:
+            ranges = [f"'{sheet_title}'!{start}:{min(start + chunk_rows - 1, row_count)}"
+                      for start in range(start_row, min(start_row + chunk_rows * ranges_per_request,
+                                                        row_count + 1), chunk_rows)]
+            result = self.sheets_service.spreadsheets().values().batchGet(
+                spreadsheetId=spreadsheet_id,
+                ranges=ranges,
+                valueRenderOption='UNFORMATTED_VALUE',
+                dateTimeRenderOption='FORMATTED_STRING'
+            ).execute()
+
+            for value_range in result.get('valueRanges', []):
+                rows = value_range.get('values', [])
+                if rows:
+                    yield rows
+                # A short chunk means we have reached the end of the sheet
+                if len(rows) < chunk_rows:
+                    return
+            start_row += chunk_rows * ranges_per_request
+
+    @staticmethod
+    def _rows_to_columns(rows, n_cols):
+        """Transpose ragged rows (trailing blanks omitted by the API) into n_cols columns."""
+        columns = list(zip_longest(*rows, fillvalue=None))[:n_cols]
+        columns += [(None,) * len(rows)] * (n_cols - len(columns))
+        return columns
+
+    @staticmethod
+    def _columns_to_frame(headers, columns):
+        """DataFrame with one column per header, keeping duplicate and blank headers."""
+        df = pd.DataFrame(dict(enumerate(columns)), columns=range(len(headers)))
+        df.columns = headers
+        return df
+
+    def _process_responses(self, schema, responses):
         """Process raw API responses into a readable format."""
         if not responses:
             return pd.DataFrame()
 
-        # Build question mapping
-        questions = {}
-        for item in form.get('items', []):
-            if 'questionItem' in item:
-                question_id = item['questionItem']['question']['questionId']
-                questions[question_id] = item['title']
-
-        # Process each response
-        processed_responses = []
-        for response in responses:
-            row = {
-                'response_id': response.get('responseId', ''),
-                'timestamp': response.get('lastSubmittedTime', ''),
-            }
-
-            # Add answers
+        # Fill one preallocated array per question instead of one dict per response
+        n_responses = len(responses)
+        answer_columns = {}
+        for i, response in enumerate(responses):
             for question_id, answer_data in response.get('answers', {}).items():
-                question_text = questions.get(
-                    question_id, f'Question_{question_id}')
+                column = answer_columns.get(question_id)
+                if column is None:
+                    column = answer_columns[question_id] = [None] * n_responses
 
                 # Extract answer based on type
                 if 'textAnswers' in answer_data:
-                    answers = [
-                        ta.get('value', '') for ta in answer_data['textAnswers'].get('answers', [])]
-                    row[question_text] = '; '.join(answers)
+                    answers = answer_data['textAnswers'].get('answers', [])
+                    if len(answers) == 1:
+                        column[i] = answers[0].get('value', '')
+                    else:
+                        column[i] = '; '.join(ta.get('value', '') for ta in answers)
                 elif 'fileUploadAnswers' in answer_data:
-                    row[question_text] = 'File uploaded'
+                    column[i] = 'File uploaded'
                 else:
-                    row[question_text] = str(answer_data)
+                    column[i] = str(answer_data)
 
-            processed_responses.append(row)
+        columns = {
+            'response_id': [response.get('responseId', '') for response in responses],
+            'timestamp': [response.get('lastSubmittedTime', '') for response in responses],
+        }
+        questions = schema['questions']
+        # Form order first, then any answers to questions missing from the schema
+        ordered_ids = [qid for qid in questions if qid in answer_columns]
+        ordered_ids += [qid for qid in answer_columns if qid not in questions]
+        for question_id in ordered_ids:
+            question = questions.get(question_id)
+            if question is None:
+                columns[f'Question_{question_id}'] = answer_columns[question_id]
+            elif question['kind'] == 'scale':
+                columns[question['title']] = pd.to_numeric(
+                    pd.Series(answer_columns[question_id], dtype=object), errors='coerce').astype('Int64')
+            else:
+                columns[question['title']] = answer_columns[question_id]
 
-        return pd.DataFrame(processed_responses)
+        return pd.DataFrame(columns)
 
     def save_to_csv(self, df, filename=None):
         """Save responses to CSV file."""
@@ -0,0 +1,218 @@
+import asyncio
+import contextlib
+import email.utils
+import os
+import random
+import threading
+import time
+from typing import Dict, Optional
+import openai
+from openai import OpenAI, AsyncOpenAI
+from dotenv import load_dotenv
+from rate_limiter import RateLimiter, estimate_tokens, get_shared_limiter
+from telemetry import telemetry
+
+load_dotenv()
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the API while the circuit breaker is open."""
+
+
+class LLMClient:
+    """
+    Chat-completion client shared by the categorizer and the summarizer.
+
+    Every request passes through the rate limiter. Rate-limit (429), 5xx,
+    timeout and connection errors are retried with jittered exponential
+    backoff, honouring Retry-After when the API sends it. After
+    `failure_threshold` consecutive failed calls the circuit opens and calls
+    fail fast for `reset_timeout` seconds, then one trial call is let through.
+
+    Failures are raised to the caller, which decides how to report them
+    (and must not cache them). Every call, failed or not, is recorded in
+    telemetry with its latency, retries and token usage; calls refused by
+    the open circuit are counted separately.
+    """
+
+    def __init__(self, api_key: str = os.getenv("OPENAI_API_KEY"), rate_limiter: Optional[RateLimiter] = None,
+                 max_retries: int = 5, base_delay: float = 1.0, max_delay: float = 60.0,
+                 failure_threshold: int = 5, reset_timeout: float = 60.0):
+        if api_key is None:
+            raise ValueError(
+                "API key must be provided either as argument or OPENAI_API_KEY environment variable")
+        self.api_key = api_key
+        # Retries are handled here, with the shared limiter and circuit breaker
+        self.client = OpenAI(api_key=api_key, max_retries=0)
+        self.rate_limiter = rate_limiter or get_shared_limiter()
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self._async_client = None
+        self._async_sessions = 0
+
+    # Circuit breaker
+
+    def _before_call(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_in_flight:
+                raise CircuitOpenError(
+                    f"LLM circuit open after {self._failures} consecutive failures")
+            # Half-open: let one trial call through
+            self._trial_in_flight = True
+
+    def _record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def _record_failure(self, transient: bool = True):
+        """Count a failed call; client errors (bad request, auth, ...) do not trip the breaker"""
+        with self._lock:
+            self._trial_in_flight = False
+            if not transient:
+                return
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    print(f"   ⚠️  LLM circuit opened after {self._failures} consecutive failures")
+                self._opened_at = time.monotonic()
+
+    # Retries
+
+    @staticmethod
+    def is_retryable(error: Exception) -> bool:
+        """Rate limits (except exhausted quota), server errors, timeouts and dropped connections"""
+        if isinstance(error, openai.RateLimitError):
+            return getattr(error, 'code', None) != 'insufficient_quota'
+        if isinstance(error, (openai.APIConnectionError, openai.InternalServerError)):
+            return True
+        return isinstance(error, openai.APIStatusError) and error.status_code in (408, 409)
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """Retry-After from the response if present, else full-jitter exponential backoff"""
+        response = getattr(error, 'response', None)
+        headers = getattr(response, 'headers', None) or {}
+        retry_after = None
+        try:
+            if headers.get('retry-after-ms'):
+                retry_after = float(headers['retry-after-ms']) / 1000
+            elif headers.get('retry-after'):
+                value = headers['retry-after']
+                try:
+                    retry_after = float(value)
+                except ValueError:
+                    retry_after = email.utils.parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            retry_after = None
+        if retry_after is not None and retry_after >= 0:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _request(self, prompt: str, max_tokens: int, temperature: float, model: str, json_mode: bool) -> Dict:
+        request = dict(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=max_tokens,
+            temperature=temperature,
+        )
+        if json_mode:
+            request["response_format"] = {"type": "json_object"}
+        return request
+
+    def complete(self, prompt: str, max_tokens: int, temperature: float,
+                 model: str = "gpt-4o", json_mode: bool = False) -> str:
+        """Send a single-message chat completion and return the stripped reply"""
+        request = self._request(prompt, max_tokens, temperature, model, json_mode)
+        started, throttled = time.perf_counter(), 0.0
+        try:
+            self._before_call()
+        except CircuitOpenError:
+            telemetry.record_short_circuit(model)
+            raise
+        for attempt in range(self.max_retries + 1):
+            waited = time.perf_counter()
+            self.rate_limiter.acquire(estimate_tokens(prompt) + max_tokens)
+            throttled += time.perf_counter() - waited
+            try:
+                response = self.client.chat.completions.create(**request)
+            except Exception as e:
+                if not self.is_retryable(e) or attempt == self.max_retries:
+                    self._record_failure(self.is_retryable(e))
+                    telemetry.record_call(model, time.perf_counter() - started, attempt,
+                                          throttled=throttled, error=e)
+                    raise
+                time.sleep(self._retry_delay(e, attempt))
+                continue
+            self._record_success()
+            telemetry.record_call(model, time.perf_counter() - started, attempt,
+                                  getattr(response, 'usage', None), throttled)
+            return response.choices[0].message.content.strip()
+
+    @contextlib.asynccontextmanager
+    async def async_session(self):
+        """
+        Share one AsyncOpenAI client between the coroutines of an event loop;
+        it is closed when the outermost session exits.
+        """
+        if self._async_sessions == 0:
+            self._async_client = AsyncOpenAI(api_key=self.api_key, max_retries=0)
+        self._async_sessions += 1
+        try:
+            yield self
+        finally:
+            self._async_sessions -= 1
+            if self._async_sessions == 0:
+                client, self._async_client = self._async_client, None
+                await client.close()
+
+    async def complete_async(self, prompt: str, max_tokens: int, temperature: float,
+                             model: str = "gpt-4o", json_mode: bool = False) -> str:
+        """Async complete(); waits on the limiter and backoff without blocking the event loop"""
+        request = self._request(prompt, max_tokens, temperature, model, json_mode)
+        started, throttled = time.perf_counter(), 0.0
+        async with self.async_session():
+            try:
+                self._before_call()
+            except CircuitOpenError:
+                telemetry.record_short_circuit(model)
+                raise
+            for attempt in range(self.max_retries + 1):
+                waited = time.perf_counter()
+                await self.rate_limiter.acquire_async(estimate_tokens(prompt) + max_tokens)
+                throttled += time.perf_counter() - waited
+                try:
+                    response = await self._async_client.chat.completions.create(**request)
+                except Exception as e:
+                    if not self.is_retryable(e) or attempt == self.max_retries:
+                        self._record_failure(self.is_retryable(e))
+                        telemetry.record_call(model, time.perf_counter() - started, attempt,
+                                              throttled=throttled, error=e)
+                        raise
+                    await asyncio.sleep(self._retry_delay(e, attempt))
+                    continue
+                self._record_success()
+                telemetry.record_call(model, time.perf_counter() - started, attempt,
+                                      getattr(response, 'usage', None), throttled)
+                return response.choices[0].message.content.strip()
+
+
+_shared_clients: Dict[str, LLMClient] = {}
+_shared_lock = threading.Lock()
+
+
+def get_shared_llm_client(api_key: str = os.getenv("OPENAI_API_KEY")) -> LLMClient:
+    """Process-wide client per API key, so every caller shares one circuit breaker."""
+    with _shared_lock:
+        if api_key not in _shared_clients:
+            _shared_clients[api_key] = LLMClient(api_key)
+        return _shared_clients[api_key]
@@ -5,14 +5,17 @@ Simple script to fetch Google Forms responses.
 
 import pandas as pd
 import os
+import config
 from forms_client import FormsClient
-from read_responses import get_responses, clean_responses
-from analyze_responses import guide_level_summary, topic_level_summary, topic_guide_level_summary, correlation_analysis
-from few_shot_examples import prepare_few_shot_examples
-from summarizer import SimpleTextSummarizer
+from read_responses import get_all_responses, clean_responses
+from response_store import ResponseStore
+from summary_state import GroupSummaryState
+from analyze_responses import hierarchical_summaries, correlation_analysis
+from few_shot_examples import FewShotIndex, prepare_few_shot_examples, to_expert_examples
 from topic_categorizer import TopicCategorizer
 from drive_uploader import upload_files_to_drive
 from excel_utils import save_excel_with_autofit
+from telemetry import telemetry
 
 
 def main():
@@ -21,31 +24,37 @@ def main():
 
     # Fetch responses
     print(f"\n📥 Fetching responses...")
-    seminar_df = get_responses(
-        "Seminar Feedback (Responses)")
-
-    wonder_df = get_responses(
-        "Wonder Session Feedback (Responses)")
+    store = ResponseStore()
+    with telemetry.stage("ingest"):
+        responses = get_all_responses(
+            list(config.FEEDBACK_SHEETS.values()), store=store,
+            max_workers=config.INGEST_MAX_WORKERS)
+    seminar_df = responses[config.FEEDBACK_SHEETS['seminar']]
+    wonder_df = responses[config.FEEDBACK_SHEETS['wonder']]
 
     # Clean responses
     print("\n🧼 Cleaning responses...")
-    seminar_df = clean_responses(seminar_df)
-    wonder_df = clean_responses(wonder_df)
+    with telemetry.stage("clean"):
+        seminar_df = clean_responses(seminar_df, compact=True)
+        wonder_df = clean_responses(wonder_df, compact=True)
 
     # Categorize response topics
     print("\\n🎯 Categorizing topics...")
     categorizer = TopicCategorizer()
-    seminar_topics = categorizer.get_reference_topics("Seminar")
-    wonder_topics = categorizer.get_reference_topics("Wonder Session")
-    print("   📚 Processing seminar topics...")
-    seminar_df = categorizer.categorize_dataframe_topics(
-        seminar_df, seminar_topics
-    )
-
-    print("   🔬 Processing wonder session topics...")
-    wonder_df = categorizer.categorize_dataframe_topics(
-        wonder_df, wonder_topics
-    )
+    with telemetry.stage("categorize"):
+        seminar_schedule = categorizer.get_reference_schedule("Seminar")
+        wonder_schedule = categorizer.get_reference_schedule("Wonder Session")
+        print("   📚 Processing seminar topics...")
+        seminar_df = categorizer.categorize_dataframe_topics(
+            seminar_df, seminar_schedule["topic"].tolist(), inplace=True, batch_size=20, concurrency=8,
+            reference_schedule=seminar_schedule, week_window=config.TOPIC_WEEK_WINDOW
+        )
+
+        print("   🔬 Processing wonder session topics...")
+        wonder_df = categorizer.categorize_dataframe_topics(
+            wonder_df, wonder_schedule["topic"].tolist(), inplace=True, batch_size=20, concurrency=8,
+            reference_schedule=wonder_schedule, week_window=config.TOPIC_WEEK_WINDOW
+        )
     seminar_summary = categorizer.get_categorization_summary(
         seminar_df)
     wonder_summary = categorizer.get_categorization_summary(
@@ -54,24 +63,44 @@ def main():
     # Analyse responses
     print("\n📊 Analysing responses...")
 
-    seminar_guide_stats = guide_level_summary(seminar_df)
-    wonder_guide_stats = guide_level_summary(wonder_df)
+    # Few-shot examples: each prompt gets the expert examples closest to its texts
+    example_index = None
+    if os.path.exists(config.FEW_SHOT_EXAMPLES_FILE):
+        examples = prepare_few_shot_examples(config.FEW_SHOT_EXAMPLES_FILE, seminar_df)
+        example_index = FewShotIndex(to_expert_examples(examples))
+
+    summary_state = GroupSummaryState()
+    seminar_kwargs = dict(state=summary_state, scope='seminar',
+                          incremental_update=config.INCREMENTAL_SUMMARIES,
+                          max_workers=config.SUMMARY_MAX_WORKERS, example_index=example_index)
+    wonder_kwargs = dict(state=summary_state, scope='wonder',
+                         incremental_update=config.INCREMENTAL_SUMMARIES,
+                         max_workers=config.SUMMARY_MAX_WORKERS, example_index=example_index)
+
+    # Topic x Guide is summarized once; Guide and topic levels are rolled up from it
+    with telemetry.stage("summarize_seminar"):
+        seminar_levels = hierarchical_summaries(seminar_df, **seminar_kwargs)
+    with telemetry.stage("summarize_wonder"):
+        wonder_levels = hierarchical_summaries(wonder_df, **wonder_kwargs)
+
+    seminar_guide_stats = seminar_levels['guide']
+    wonder_guide_stats = wonder_levels['guide']
 
     print("\n--- Seminar Guide Stats ---")
     print(seminar_guide_stats)
     print("\n--- Wonder Session Guide Stats ---")
     print(wonder_guide_stats)
 
-    seminar_topic_stats = topic_level_summary(seminar_df)
-    wonder_topic_stats = topic_level_summary(wonder_df)
+    seminar_topic_stats = seminar_levels['topic']
+    wonder_topic_stats = wonder_levels['topic']
 
     print("\n--- Seminar Topic Stats ---")
     print(seminar_topic_stats)
     print("\n--- Wonder Session Topic Stats ---")
     print(wonder_topic_stats)
 
-    seminar_topic_guide_stats = topic_guide_level_summary(seminar_df)
-    wonder_topic_guide_stats = topic_guide_level_summary(wonder_df)
+    seminar_topic_guide_stats = seminar_levels['topic_guide']
+    wonder_topic_guide_stats = wonder_levels['topic_guide']
 
     # Save to Excel
     save_excel_with_autofit(seminar_topic_stats,
@@ -104,15 +133,15 @@ def main():
 
     # Generate topic comparison CSVs
     print("\n📋 Generating topic comparison CSVs...")
-    seminar_comparison = seminar_df[['topic', 'matched_topic']].copy()
-    seminar_comparison.columns = ['Original Topic', 'Matched Topic']
-    seminar_comparison = seminar_comparison.sort_values('Original Topic')
+    seminar_comparison = seminar_df[['topic', 'canonical_topic', 'matched_topic']].copy()
+    seminar_comparison.columns = ['Original Topic', 'Canonical Topic', 'Matched Topic']
+    seminar_comparison = seminar_comparison.sort_values(['Canonical Topic', 'Original Topic'])
     save_excel_with_autofit(
         seminar_comparison, 'output/topic comparisons/seminar_topic_comparison.xlsx')
 
-    wonder_comparison = wonder_df[['topic', 'matched_topic']].copy()
-    wonder_comparison.columns = ['Original Topic', 'Matched Topic']
-    wonder_comparison = wonder_comparison.sort_values('Original Topic')
+    wonder_comparison = wonder_df[['topic', 'canonical_topic', 'matched_topic']].copy()
+    wonder_comparison.columns = ['Original Topic', 'Canonical Topic', 'Matched Topic']
+    wonder_comparison = wonder_comparison.sort_values(['Canonical Topic', 'Original Topic'])
     save_excel_with_autofit(
         wonder_comparison, 'output/topic comparisons/wonder_topic_comparison.xlsx')
 
@@ -122,19 +151,15 @@ def main():
     combined_comparison = pd.concat(
         [seminar_comparison, wonder_comparison], ignore_index=True)
     combined_comparison = combined_comparison.sort_values(
-        ['Session Type', 'Original Topic'])
+        ['Session Type', 'Canonical Topic', 'Original Topic'])
     save_excel_with_autofit(
         combined_comparison, 'output/topic comparisons/combined_topic_comparison.xlsx')
     print(f"   💾 Saved topic comparison files")
 
-    # Summarize qual feedback
-    # Prepare few shot examples
-    # examples_dict = prepare_few_shot_examples(
-    #     'input/few_shot_examples.csv', seminar_df)
-
-    # summarizer = SimpleTextSummarizer()
-    # summarizer.add_expert_examples(examples_dict)
-    # feedback_summary = summarizer.summarize(seminar_df[1:100])
+    # LLM calls, tokens, cost and cache hit rates per stage
+    print("\n📈 Writing LLM telemetry report...")
+    telemetry.print_summary()
+    print(f"   💾 Saved to: {telemetry.write_report()}")
 
     # Upload files to Google Drive
     drive_folder_id = os.getenv('DRIVE_FOLDER_ID')
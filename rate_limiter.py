@@ -0,0 +1,97 @@
+import asyncio
+import os
+import threading
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Account limits for the OpenAI API (override in .env)
+REQUESTS_PER_MINUTE = int(os.getenv("OPENAI_REQUESTS_PER_MINUTE", 500))
+TOKENS_PER_MINUTE = int(os.getenv("OPENAI_TOKENS_PER_MINUTE", 30000))
+
+
+try:
+    import tiktoken
+except ImportError:  # optional; fall back to the character heuristic
+    tiktoken = None
+
+_encodings = {}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) for rate limiting."""
+    return len(text) // 4 + 1
+
+
+def count_tokens(text: str, model: str = "gpt-4o") -> int:
+    """Token count for the model's tokenizer if tiktoken is installed, else estimate_tokens."""
+    if tiktoken is None:
+        return estimate_tokens(text)
+    if model not in _encodings:
+        try:
+            _encodings[model] = tiktoken.encoding_for_model(model)
+        except KeyError:
+            _encodings[model] = tiktoken.get_encoding("o200k_base")
+    return len(_encodings[model].encode(text, disallowed_special=()))
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter on requests per minute and tokens per minute.
+
+    Thread-safe and usable from both threads (acquire) and asyncio
+    (acquire_async), so one instance can be shared by every LLM caller.
+    """
+
+    def __init__(self, requests_per_minute: int = REQUESTS_PER_MINUTE,
+                 tokens_per_minute: int = TOKENS_PER_MINUTE):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: int) -> float:
+        """Take one request and `tokens` tokens if available, else return seconds to wait."""
+        tokens = min(tokens, self.tokens_per_minute)
+        with self._lock:
+            now = time.monotonic()
+            elapsed_minutes = (now - self._updated) / 60
+            self._updated = now
+            self._requests = min(self.requests_per_minute,
+                                 self._requests + elapsed_minutes * self.requests_per_minute)
+            self._tokens = min(self.tokens_per_minute,
+                               self._tokens + elapsed_minutes * self.tokens_per_minute)
+
+            if self._requests >= 1 and self._tokens >= tokens:
+                self._requests -= 1
+                self._tokens -= tokens
+                return 0.0
+            request_wait = max(0.0, 1 - self._requests) / self.requests_per_minute * 60
+            token_wait = max(0.0, tokens - self._tokens) / self.tokens_per_minute * 60
+            return max(request_wait, token_wait)
+
+    def acquire(self, tokens: int = 0):
+        """Block until a request of `tokens` tokens may be sent."""
+        while (wait := self._reserve(tokens)) > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: int = 0):
+        """Wait (without blocking the event loop) until a request may be sent."""
+        while (wait := self._reserve(tokens)) > 0:
+            await asyncio.sleep(wait)
+
+
+_shared_limiter = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_limiter() -> RateLimiter:
+    """Process-wide limiter shared by the categorizer and summarizer."""
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RateLimiter()
+        return _shared_limiter
@@ -1,19 +1,71 @@
 import gc
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 import pygsheets
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from datetime import datetime
+from correction_rules import CORRECTION_RULES, apply_rules
 
 load_dotenv()
 
 
-def get_responses(title, worksheet="Form Responses 1"):
-    gc = pygsheets.authorize(service_file=os.getenv("SERVICE_ACCOUNT_FILE"))
-    sheet = gc.open(title)
-    wks = sheet.worksheet_by_title("Form Responses 1")
-    all_records = wks.get_all_records()
-    df = pd.DataFrame(all_records)
+def authorize():
+    """Authorize a pygsheets client with the service account."""
+    return pygsheets.authorize(service_file=os.getenv("SERVICE_ACCOUNT_FILE"))
+
+
+def get_responses(title, worksheet="Form Responses 1", store=None, refresh=True, full_refresh=False,
+                  client=None):
+    """
+    Fetch form responses from a Google Sheet.
+
+    Args:
+        title: Title of the responses spreadsheet
+        worksheet: Worksheet holding the responses
+        store: Optional ResponseStore; history is then loaded from disk and
+            only sheet rows past the last ingested row are fetched. If that
+            row no longer holds the response stored for it (rows were deleted
+            or reordered), the whole sheet is re-read instead
+        refresh: If False (store only), skip the Sheets API entirely
+        full_refresh: Re-read the whole sheet; edited rows replace their
+            stored versions and deleted rows are dropped from the store
+        client: Authorized pygsheets client to reuse (authorizes if omitted)
+
+    Returns:
+        DataFrame: One row per response
+    """
+    if store is None:
+        gc = client or authorize()
+        sheet = gc.open(title)
+        wks = sheet.worksheet_by_title(worksheet)
+        all_records = wks.get_all_records()
+        df = pd.DataFrame(all_records)
+    else:
+        if refresh:
+            gc = client or authorize()
+            wks = gc.open(title).worksheet_by_title(worksheet)
+            ingested = 0 if full_refresh else store.sheet_rows(title)
+            new_rows = None
+            if ingested:
+                # Re-read the last ingested row to check the sheet has not shifted
+                tail = _get_rows_from(wks, ingested + 1)
+                if len(tail) and tail['Timestamp'].iloc[0] == store.last_timestamp(title):
+                    new_rows = tail.iloc[1:]
+                else:
+                    print(f"   ⚠️  Rows of '{title}' changed since the last read; re-reading the whole sheet")
+            if new_rows is None:
+                new_rows = _get_rows_from(wks, 2)
+                added = store.merge(title, new_rows, sheet_rows=len(new_rows), replace=True)
+            else:
+                added = store.merge(title, new_rows, sheet_rows=ingested + len(new_rows))
+            print(f"   ↻ Merged {added} new or edited rows from '{title}' into local store")
+        df = store.load(title)
+
     if df.empty:
         print(f"No responses found in '{title}'.")
     else:
@@ -22,6 +74,46 @@ def get_responses(title, worksheet="Form Responses 1"):
     return df
 
 
+def get_all_responses(titles, worksheet="Form Responses 1", store=None, max_workers=4, **kwargs):
+    """
+    Fetch several response sheets concurrently.
+
+    Authorizes once and shares the credentials; each worker thread builds its
+    own client on top of them because the underlying HTTP connection is not
+    thread-safe.
+
+    Returns:
+        dict: Title -> DataFrame, in the order of `titles`
+    """
+    credentials = authorize().oauth
+    local = threading.local()
+
+    def fetch(title):
+        if not hasattr(local, 'client'):
+            local.client = pygsheets.client.Client(credentials)
+        start = time.perf_counter()
+        df = get_responses(title, worksheet, store=store,
+                           client=local.client, **kwargs)
+        print(f"   ⏱️  '{title}' fetched in {time.perf_counter() - start:.2f}s")
+        return df
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(titles)))) as executor:
+        frames = list(executor.map(fetch, titles))
+    print(f"   ⏱️  Ingested {len(titles)} sheets in {time.perf_counter() - start:.2f}s")
+    return dict(zip(titles, frames))
+
+
+def _get_rows_from(wks, first_row):
+    """Read sheet rows from first_row (1-based, header is row 1) to the end."""
+    header = wks.get_row(1, include_tailing_empty=False)
+    if first_row > wks.rows:
+        return pd.DataFrame(columns=header)
+    values = wks.get_values(start=(first_row, 1), end=(wks.rows, len(header)),
+                            include_tailing_empty=True, include_tailing_empty_rows=False)
+    return pd.DataFrame(values, columns=header)
+
+
 def identify_topics(df):
     topic_cols = ["What was your Seminar topic?",
                   "What was your Wonder Session topic / title?"]
@@ -32,51 +124,153 @@ def identify_topics(df):
     return df
 
 
-def clean_responses(df):
+# Quant questions, parsed straight to nullable integers
+cols_quant = ['I felt comfortable as a student in this Seminar.',
+              'I felt like my voice mattered in this Seminar.',
+              'I felt like I could connect with the Guide as a person.',
+              'The content of the Seminar was interesting to me.',
+              'I learned a lot from the Seminar.',
+              'How much did it "wow" you?', 'How much fun did you have?',
+              'Did it leave you wanting to learn more about this topic?']
+
+cols_guide = ["What was the name of the Guide who delivered your Seminar?",
+              "What was the name of the Guide who delivered your Wonder Session?"]
+
+
+# Timestamp format of Google Forms response sheets
+SHEETS_TIMESTAMP_FORMAT = '%m/%d/%Y %H:%M:%S'
+
+
+def parse_timestamps(values):
+    """
+    Parse sheet timestamps to datetime64.
+
+    Uses Arrow's vectorized strptime for the standard Sheets format and falls
+    back to pandas' format inference for anything it cannot parse.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    try:
+        parsed = pc.strptime(pa.array(values, type=pa.string(), from_pandas=True),
+                             format=SHEETS_TIMESTAMP_FORMAT, unit='s', error_is_null=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pd.to_datetime(values, errors='coerce')
+
+    timestamps = pd.Series(parsed.to_pandas(), index=values.index).astype('datetime64[ns]')
+    unparsed = timestamps.isna() & values.notna()
+    if unparsed.any():
+        timestamps[unparsed] = pd.to_datetime(values[unparsed], format='mixed', errors='coerce')
+    return timestamps
+
+
+def week_columns(timestamps):
+    """
+    Return ('%Y-%W' labels, Monday-of-week dates) for a datetime Series.
+
+    week_start is derived arithmetically; labels are formatted once per
+    distinct day rather than once per row.
+    """
+    days = timestamps.dt.normalize()
+    week_start = days - pd.to_timedelta(timestamps.dt.dayofweek, unit='D')
+    codes, unique_days = pd.factorize(days)
+    labels = np.asarray(unique_days.strftime('%Y-%W'), dtype=object)[codes]
+    labels[codes == -1] = np.nan
+    return pd.Series(labels, index=timestamps.index, dtype=object), week_start
+
+
+def to_numeric(values):
+    """pd.to_numeric(errors='coerce') with a fast path for numbers mixed with blank cells."""
+    try:
+        return values.mask(values.eq('')).astype('float64')
+    except (TypeError, ValueError):
+        return pd.to_numeric(values, errors='coerce')
+
+
+def blank_to_na(df):
+    """Replace empty / whitespace-only strings with NA, touching only text columns."""
+    for col in df.columns[[dtype == object or pd.api.types.is_string_dtype(dtype)
+                           for dtype in df.dtypes]]:
+        try:
+            blank = df[col].str.strip() == ''
+        except AttributeError:
+            # Object column without any strings
+            continue
+        if blank.any():
+            df[col] = df[col].mask(blank)
+    return df
+
+
+# Low-cardinality text columns stored as categoricals in compact mode
+cols_categorical = ['Guide', 'topic', 'matched_topic', 'match_confidence', 'year-week',
+                    "What was your Seminar topic?",
+                    "What was your Wonder Session topic / title?"] + cols_guide
+
+
+def bytes_per_row(df):
+    """Deep memory usage of a DataFrame divided by its row count."""
+    return df.memory_usage(deep=True).sum() / max(len(df), 1)
+
+
+def compact_frame(df, max_category_ratio=0.5):
+    """
+    Shrink a cleaned responses frame in place.
+
+    Low-cardinality text columns become categoricals and quant answers
+    (1-10 scale) are downcast to Int8.
+    """
+    for col in [col for col in cols_categorical if col in df.columns]:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            continue
+        # Columns with mostly unique values would not get smaller
+        if df[col].nunique() <= max_category_ratio * len(df):
+            df[col] = df[col].astype('category')
+
+    for col in [col for col in cols_quant if col in df.columns]:
+        values = df[col]
+        if values.isna().all() or (values.min() >= -128 and values.max() <= 127):
+            df[col] = values.astype('Int8')
+    return df
+
+
+def clean_responses(df, compact=False, rules=CORRECTION_RULES):
+    """
+    Clean raw sheet responses.
+
+    Historical fixes come from `rules` (see correction_rules). With
+    compact=True, low-cardinality text columns are stored as categoricals
+    and quant answers as Int8 (see compact_frame).
+    """
     # Convert Timestamp to datetime
-    df['Timestamp'] = pd.to_datetime(df['Timestamp'], errors='coerce')
-    df['year-week'] = df['Timestamp'].dt.strftime('%Y-%W')
-    df['week_start'] = pd.to_datetime(
-        df['year-week'] + '-1', format='%Y-%W-%w')
-
-    # Scale certain columns from base-5 to base-10 for responses before Aug 13, 2025
-    cols_to_scale = ['I felt comfortable as a student in this Seminar.',
-                     'I felt like my voice mattered in this Seminar.',
-                     'I felt like I could connect with the Guide as a person.',
-                     'The content of the Seminar was interesting to me.']
-    cols_to_scale = [col for col in cols_to_scale if col in df.columns]
-    df.loc[df['Timestamp'] < datetime(
-        2025, 8, 13), cols_to_scale] = df.loc[df['Timestamp'] < datetime(2025, 8, 13), cols_to_scale]*2
-
-    guide_col = 'What was the name of the Guide who delivered your Seminar?'
-    if guide_col in df.columns:
-        df.loc[(df['Timestamp'] < datetime(2025, 8, 20)) & (
-            df[guide_col] == 'N/A'), guide_col] = "Megan Hanley"
+    df['Timestamp'] = parse_timestamps(df['Timestamp'])
+    df['year-week'], df['week_start'] = week_columns(df['Timestamp'])
+
+    # Convert quant questions to numeric while parsing; blanks become NA
+    quant_avail = [col for col in cols_quant if col in df.columns]
+    for col in quant_avail:
+        df[col] = to_numeric(df[col])
+
+    # Historical corrections (rescaling, Guide reattribution, ...)
+    df = apply_rules(df, rules)
 
     # Drop columns that are completely empty
-    df = df.replace(r'^\s*$', pd.NA, regex=True)
+    df = blank_to_na(df)
     df = df.dropna(axis=1, how='all')
 
-    # Convert quant questions to numeric if not already
-    cols_quant = ['I felt comfortable as a student in this Seminar.',
-                  'I felt like my voice mattered in this Seminar.',
-                  'I felt like I could connect with the Guide as a person.',
-                  'The content of the Seminar was interesting to me.',
-                  'I learned a lot from the Seminar.',
-                  'How much did it "wow" you?', 'How much fun did you have?',
-                  'Did it leave you wanting to learn more about this topic?']
-    cols_quant = [col for col in cols_quant if col in df.columns]
-    # df[cols_quant] = df[cols_quant].apply(pd.to_numeric, errors='coerce')
-    df = df.astype({col: 'Int64' for col in cols_quant})
-    print(df[cols_quant].describe())
+    quant_avail = [col for col in quant_avail if col in df.columns]
+    for col in quant_avail:
+        df[col] = df[col].astype('Int64')
+    print(df[quant_avail].describe())
 
     # Attribute Guides
-    cols_guide = ["What was the name of the Guide who delivered your Seminar?",
-                  "What was the name of the Guide who delivered your Wonder Session?"]
-    cols_guide = [col for col in cols_guide if col in df.columns]
-    df['Guide'] = df[cols_guide[0]]
+    guide_avail = [col for col in cols_guide if col in df.columns]
+    df['Guide'] = df[guide_avail[0]]
     print(df.columns)
 
     df = identify_topics(df)
 
+    if compact:
+        before = bytes_per_row(df)
+        df = compact_frame(df)
+        print(f"   🗜️  Compact frame: {before:,.0f} → {bytes_per_row(df):,.0f} bytes/row")
+
     return df
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import urllib.request
+from urllib.error import HTTPError, URLError
+from typing import Dict, List
+import pandas as pd
+import config
+
+# Planning sheet with the scheduled Seminar / Wonder Session topics per week
+PLANNING_SHEET_URL = "https://docs.google.com/spreadsheets/d/1i5OZu7UVwcwQpYk7R8gSwvlW3FigO906etXPYG4t_Ec/export?format=csv&gid=0"
+
+# Planning-sheet entries that mark a week without a session
+NO_SESSION_MARKERS = ["NO WONDER SESSION", "NO SEMINAR", "NO WS", "NO SEM"]
+
+
+class ReferenceTopicProvider:
+    """
+    Loads the planning sheet once and serves every topic column from the
+    same parsed frame.
+
+    Remote sheets are mirrored to an on-disk snapshot. The snapshot is used
+    as-is for `ttl` seconds, then revalidated with a conditional GET
+    (ETag / Last-Modified), and used as a fallback whenever the fetch fails.
+    """
+
+    def __init__(self, url: str = PLANNING_SHEET_URL, snapshot_dir: str = config.REFERENCE_SNAPSHOT_DIR,
+                 ttl: float = config.REFERENCE_TTL_SECONDS, timeout: float = 30):
+        self.url = url
+        self.ttl = ttl
+        self.timeout = timeout
+        name = hashlib.sha1(url.encode('utf-8')).hexdigest()[:12]
+        self.snapshot_path = os.path.join(snapshot_dir, f"{name}.csv")
+        self.meta_path = os.path.join(snapshot_dir, f"{name}.json")
+        self._frame = None
+        self._lock = threading.Lock()
+
+    def frame(self) -> pd.DataFrame:
+        """The parsed planning sheet (fetched at most once per provider)."""
+        with self._lock:
+            if self._frame is None:
+                source = self._refresh_snapshot() if self.url.startswith(('http://', 'https://')) else self.url
+                df = pd.read_csv(source)
+                df["week_start"] = pd.to_datetime(
+                    df["Week Start"], format="%Y/%m/%d", errors='coerce')
+                self._frame = df
+            return self._frame
+
+    def schedule(self, column: str) -> pd.DataFrame:
+        """
+        Week-by-week view of a topic column: one row per scheduled topic with
+        its week_start, up to today, excluding no-session weeks.
+        """
+        df = self.frame()
+        df = df.loc[df["week_start"] <= pd.Timestamp.today(), ["week_start", column]]
+        df = df.dropna(subset=[column]).rename(columns={column: "topic"})
+        no_session = df["topic"].str.upper().str.contains(
+            "|".join(NO_SESSION_MARKERS), regex=True, na=False)
+        return df[~no_session].reset_index(drop=True)
+
+    def topics(self, column: str) -> List[str]:
+        """Topics scheduled up to today in the given column, excluding no-session weeks."""
+        return self.schedule(column)["topic"].tolist()
+
+    def _load_meta(self) -> Dict:
+        if not os.path.exists(self.meta_path):
+            return {}
+        try:
+            with open(self.meta_path, 'r') as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def _refresh_snapshot(self) -> str:
+        """Make sure the snapshot is fresh enough and return its path."""
+        meta = self._load_meta()
+        has_snapshot = os.path.exists(self.snapshot_path)
+        if has_snapshot and time.time() - meta.get('fetched_at', 0) < self.ttl:
+            return self.snapshot_path
+
+        request = urllib.request.Request(self.url)
+        if has_snapshot and meta.get('etag'):
+            request.add_header('If-None-Match', meta['etag'])
+        if has_snapshot and meta.get('last_modified'):
+            request.add_header('If-Modified-Since', meta['last_modified'])
+
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                body = response.read()
+                headers = response.headers
+        except HTTPError as e:
+            if e.code == 304 and has_snapshot:
+                meta['fetched_at'] = time.time()
+                self._write_meta(meta)
+                return self.snapshot_path
+            return self._fallback(e, has_snapshot)
+        except (URLError, OSError) as e:
+            return self._fallback(e, has_snapshot)
+
+        os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+        with open(f"{self.snapshot_path}.tmp", 'wb') as f:
+            f.write(body)
+        os.replace(f"{self.snapshot_path}.tmp", self.snapshot_path)
+        self._write_meta({
+            'url': self.url,
+            'fetched_at': time.time(),
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+        })
+        return self.snapshot_path
+
+    def _fallback(self, error: Exception, has_snapshot: bool) -> str:
+        if not has_snapshot:
+            raise error
+        print(f"Warning: Could not fetch reference topics ({error}); using snapshot {self.snapshot_path}")
+        return self.snapshot_path
+
+    def _write_meta(self, meta: Dict):
+        os.makedirs(os.path.dirname(self.meta_path), exist_ok=True)
+        with open(f"{self.meta_path}.tmp", 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(f"{self.meta_path}.tmp", self.meta_path)
+
+
+_providers: Dict[str, ReferenceTopicProvider] = {}
+_providers_lock = threading.Lock()
+
+
+def get_reference_provider(url: str = PLANNING_SHEET_URL) -> ReferenceTopicProvider:
+    """Shared provider per planning-sheet URL, so each sheet is fetched once per run."""
+    with _providers_lock:
+        if url not in _providers:
+            _providers[url] = ReferenceTopicProvider(url)
+        return _providers[url]
@@ -0,0 +1,151 @@
+import json
+import os
+import re
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import config
+
+ROW_HASH_COLUMN = '_row_hash'
+KEY_COLUMNS = ['Timestamp', ROW_HASH_COLUMN]
+
+
+def row_hashes(df: pd.DataFrame) -> pd.Series:
+    """
+    Hash each row's non-empty cells (keyed by column name).
+
+    Empty cells are skipped so that a question added to the form later does
+    not change the hash of responses submitted before it existed.
+    """
+    cols = sorted(col for col in df.columns if col != ROW_HASH_COLUMN)
+    row_text = pd.Series('', index=df.index, dtype=object)
+    for col in cols:
+        values = df[col].fillna('').astype(str)
+        row_text = row_text.where(values == '', row_text + f"{col}=" + values + '\x1f')
+    return pd.util.hash_pandas_object(row_text, index=False)
+
+
+class ResponseStore:
+    """
+    Local Parquet store of form responses, one dataset per form title.
+
+    Every sheet column is stored as a string alongside a uint64 row hash.
+    Tail merges append a fragment holding the rows not already stored
+    (deduplicated on Timestamp + row hash). Sheet timestamps only resolve to
+    the second, so a Timestamp alone does not identify a response; edited
+    and deleted rows are picked up by a full read, which replaces the store.
+    """
+
+    def __init__(self, root: str = config.RESPONSE_STORE_DIR):
+        self.root = root
+
+    def _dataset_dir(self, title: str) -> str:
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', title).strip('_').lower()
+        return os.path.join(self.root, slug)
+
+    def _manifest_path(self, title: str) -> str:
+        return os.path.join(self._dataset_dir(title), 'manifest.json')
+
+    def _load_manifest(self, title: str) -> dict:
+        path = self._manifest_path(title)
+        if not os.path.exists(path):
+            return {'sheet_rows': 0, 'last_timestamp': None, 'fragments': []}
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def _save_manifest(self, title: str, manifest: dict):
+        path = self._manifest_path(title)
+        with open(f"{path}.tmp", 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(f"{path}.tmp", path)
+
+    def sheet_rows(self, title: str) -> int:
+        """Number of sheet data rows already ingested for this form."""
+        return self._load_manifest(title)['sheet_rows']
+
+    def last_timestamp(self, title: str):
+        """Timestamp of the last ingested sheet row, used to validate tail reads."""
+        return self._load_manifest(title).get('last_timestamp')
+
+    def load(self, title: str) -> pd.DataFrame:
+        """Load the full response history for a form via memory-mapped reads."""
+        manifest = self._load_manifest(title)
+        if not manifest['fragments']:
+            return pd.DataFrame()
+        # Fragments written before a question was added lack its column
+        return self._read_fragments(title, manifest).to_pandas()
+
+    def merge(self, title: str, df: pd.DataFrame, sheet_rows: int = None,
+              replace: bool = False) -> int:
+        """
+        Store rows not already in the store.
+
+        Args:
+            title: Form title the rows belong to
+            df: Raw response rows as read from the sheet
+            sheet_rows: Total sheet data rows ingested so far, recorded for tail reads
+            replace: df is the whole sheet; rewrite the store as exactly these
+                rows, so edited rows replace their old versions and deleted
+                rows are dropped. Without it rows are only ever appended.
+
+        Returns:
+            int: Number of rows not previously stored (new or edited)
+        """
+        manifest = self._load_manifest(title)
+        rows = pd.DataFrame()
+        if not df.empty:
+            rows = df.astype(str)
+            rows[ROW_HASH_COLUMN] = row_hashes(rows)
+            rows = rows.drop_duplicates(subset=KEY_COLUMNS)
+
+        current = self._current_keys(title, manifest)
+        changed = 0
+        if not rows.empty:
+            is_new = ~pd.MultiIndex.from_frame(rows[KEY_COLUMNS]).isin(current)
+            changed = int(is_new.sum())
+            if not replace:
+                rows = rows[is_new]
+
+        old_fragments = list(manifest['fragments'])
+        if replace:
+            manifest['fragments'] = []
+        if not rows.empty and (replace or changed):
+            manifest['fragments'].append(self._write_fragment(title, manifest, rows))
+
+        if sheet_rows is not None:
+            manifest['sheet_rows'] = sheet_rows
+            if not df.empty:
+                manifest['last_timestamp'] = str(df['Timestamp'].iloc[-1])
+        if changed or replace or sheet_rows is not None:
+            os.makedirs(self._dataset_dir(title), exist_ok=True)
+            self._save_manifest(title, manifest)
+        if replace:
+            for fragment in old_fragments:
+                os.remove(os.path.join(self._dataset_dir(title), fragment))
+        return changed
+
+    def _write_fragment(self, title: str, manifest: dict, rows: pd.DataFrame) -> str:
+        os.makedirs(self._dataset_dir(title), exist_ok=True)
+        number = manifest.get('next_fragment', len(manifest['fragments']))
+        manifest['next_fragment'] = number + 1
+        fragment = f"part-{number:05d}.parquet"
+        schema = pa.schema([(col, pa.uint64() if col == ROW_HASH_COLUMN else pa.string())
+                            for col in rows.columns])
+        table = pa.Table.from_pandas(rows, schema=schema, preserve_index=False)
+        path = os.path.join(self._dataset_dir(title), fragment)
+        pq.write_table(table, f"{path}.tmp")
+        os.replace(f"{path}.tmp", path)
+        return fragment
+
+    def _read_fragments(self, title: str, manifest: dict, columns=None) -> pa.Table:
+        tables = [pq.read_table(os.path.join(self._dataset_dir(title), fragment),
+                                columns=columns, memory_map=True)
+                  for fragment in manifest['fragments']]
+        return pa.concat_tables(tables, promote_options='default')
+
+    def _current_keys(self, title: str, manifest: dict) -> pd.MultiIndex:
+        """Dedupe keys of the stored rows, reading only the key columns."""
+        if not manifest['fragments']:
+            return pd.MultiIndex.from_arrays([[], []], names=KEY_COLUMNS)
+        return pd.MultiIndex.from_frame(
+            self._read_fragments(title, manifest, columns=KEY_COLUMNS).to_pandas())
@@ -1,23 +1,102 @@
 import pandas as pd
-from openai import OpenAI
 import json
-from typing import List, Dict
+import hashlib
+import atexit
+from typing import List, Dict, Optional
 import os
 from dotenv import load_dotenv
+import threading
+from cache_store import open_cache_store
+from text_similarity import collapse_near_duplicates
+from concurrent.futures import ThreadPoolExecutor
+from rate_limiter import RateLimiter, count_tokens
+from llm_client import LLMClient, get_shared_llm_client
+from telemetry import telemetry
 
 load_dotenv()
 
 
 class SimpleTextSummarizer:
-    def __init__(self, api_key: str = os.getenv("OPENAI_API_KEY")):
+    model = "gpt-4o"
+    temperature = 0.3
+    max_tokens = 300
+
+    def __init__(self, api_key: str = os.getenv("OPENAI_API_KEY"), cache_file: str = "summary_cache.sqlite",
+                 use_cache: bool = True, max_cache_entries: Optional[int] = 5000,
+                 rate_limiter: Optional[RateLimiter] = None, token_budget: int = 12000,
+                 max_workers: int = 4, dedupe_threshold: Optional[float] = 0.85,
+                 llm_client: Optional[LLMClient] = None):
+        """
+        Args:
+            cache_file: Summary cache keyed on a hash of the model settings,
+                rendered prompt and few-shot examples (.json for the JSON backend)
+            max_cache_entries: Least recently used summaries beyond this are evicted
+            rate_limiter: Requests/tokens-per-minute limiter (defaults to the shared one)
+            token_budget: Maximum prompt tokens per request; larger groups are
+                summarized in chunks and merged (map-reduce)
+            max_workers: Chunk summaries requested concurrently
+            dedupe_threshold: Character n-gram similarity above which texts are
+                collapsed into one with a (×n) count (None disables)
+            llm_client: Client with retries and circuit breaker (defaults to the
+                shared one, or one using rate_limiter if given)
+
+        Safe to share across threads.
+        """
         if api_key is None:
             raise ValueError(
                 "API key must be provided either as argument or OPENAI_API_KEY environment variable")
-        self.client = OpenAI(
-            # This is the default and can be omitted
-            api_key=api_key
-        )
+        self.llm = llm_client or (LLMClient(api_key, rate_limiter) if rate_limiter
+                                  else get_shared_llm_client(api_key))
         self.expert_examples = []
+        self.example_index = None
+        self.use_cache = use_cache
+        self.summary_cache = self._load_cache(cache_file, max_cache_entries) if use_cache else {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._stats_lock = threading.Lock()
+        self.token_budget = token_budget
+        self.max_workers = max_workers
+        self.dedupe_threshold = dedupe_threshold
+
+    def _load_cache(self, cache_file: str, max_cache_entries: Optional[int]):
+        try:
+            store = open_cache_store(cache_file, max_entries=max_cache_entries)
+        except Exception as e:
+            print(f"Warning: Could not open summary cache {cache_file}: {e}")
+            return {}
+        atexit.register(store.flush)
+        return store
+
+    def _cache_key(self, prompt: str) -> str:
+        """Content address of a request: model settings, few-shot set and rendered prompt"""
+        examples = hashlib.sha256(
+            json.dumps(self.expert_examples, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+        request = json.dumps({
+            "model": self.model,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+            "examples": examples,
+            "prompt": prompt,
+        }, sort_keys=True)
+        return f"summary::{hashlib.sha256(request.encode('utf-8')).hexdigest()}"
+
+    def settings_hash(self, prompt_append: str = "") -> str:
+        """
+        Hash of everything besides the texts that shapes a summary: model
+        settings, few-shot examples and the prompt addition. An example index
+        contributes its identity (expert summaries, k and budget) rather than
+        the feedback texts it matches on, which grow with every new response.
+        """
+        index = self.example_index
+        settings = json.dumps({
+            "model": self.model,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+            "examples": self.expert_examples,
+            "example_index": None if index is None else index.identity,
+            "prompt_append": prompt_append,
+        }, sort_keys=True, default=str)
+        return hashlib.sha1(settings.encode('utf-8')).hexdigest()
 
     def add_expert_examples(self, examples: List[Dict]):
         """
@@ -26,45 +105,183 @@ class SimpleTextSummarizer:
         """
         self.expert_examples = examples
 
+    def set_example_index(self, example_index):
+        """
+        Pick few-shot examples per prompt from a FewShotIndex (the examples
+        most similar to the texts being summarized) instead of using all of them.
+        """
+        self.example_index = example_index
+
+    def _examples_for(self, texts: List[str]) -> List[Dict]:
+        if self.example_index is not None:
+            return self.example_index.select(texts)
+        return self.expert_examples
+
+    def _prompt_preamble(self, examples: List[Dict] = ()) -> List[str]:
+        """Instruction and few-shot example lines shared by all summary prompts"""
+        lines = [
+            "You are modelling an expert at summarizing feedback on sessions (Wonder Sessions or Seminars) given by Guides (teachers or educators). "
+            "We want you to provide insightful but tactful and CONCISE feedback. Drop superfluous words. "
+            "You will summarize feedback into concise statements based on provided feedback texts given by students. Quote representative feedback where necessary. "
+            "A trailing (×n) means n students gave essentially the same feedback.\n"
+        ]
+        for i, example in enumerate(examples, start=1):
+            lines.append(f"Example {i}:")
+            lines.append("Texts to summarize:")
+            lines += [f"- {text}" for text in example["texts"]]
+            lines.append(f"\nExpert Summary: {example['summary']}\n")
+        return lines
+
     def create_prompt(self, texts: List[str]) -> str:
         """Create prompt with few-shot examples"""
-        prompt = ("You are modelling an expert at summarizing feedback on sessions (Wonder Sessions or Seminars) given by Guides (teachers or educators). " +
-                  "We want you to provide insightful but tactful and CONCISE feedback. Drop superfluous words." +
-                  "You will summarize feedback into concise statements based on provided feedback texts given by students. Quote representative feedback where necessary.")
+        lines = self._prompt_preamble(self._examples_for(texts))
+        lines.append("Now summarize these texts:")
+        lines += [f"- {text}" for text in texts]
+        lines.append("\nProvide a concise summary:")
+        return "\n".join(lines)
+
+    def create_update_prompt(self, previous_summary: str, new_texts: List[str]) -> str:
+        """Create prompt that folds new texts into an existing summary"""
+        lines = self._prompt_preamble(self._examples_for(new_texts))
+        lines.append(f"Here is a summary of earlier feedback:\n{previous_summary}\n")
+        lines.append("Update it to also reflect these new texts, keeping points that still hold:")
+        lines += [f"- {text}" for text in new_texts]
+        lines.append("\nProvide the updated concise summary:")
+        return "\n".join(lines)
+
+    def create_reduce_prompt(self, summaries: List[str]) -> str:
+        """Create prompt that merges partial summaries of one group's feedback"""
+        lines = self._prompt_preamble()
+        lines.append("These are summaries of different parts of the same feedback. "
+                     "Merge them into one summary, combining repeated points:")
+        lines += [f"Part {i}:\n{summary}\n" for i, summary in enumerate(summaries, 1)]
+        lines.append("Provide a concise summary:")
+        return "\n".join(lines)
 
-        for i, example in enumerate(self.expert_examples, start=1):
-            prompt += f"Example {i}:\n"
-            prompt += "Texts to summarize:\n"
-            for j, text in enumerate(example["texts"], 1):
-                prompt += f"- {text}\n"
-            prompt += f"\nExpert Summary: {example['summary']}\n\n"
+    def _with_append(self, prompt: str, prompt_append: str) -> str:
+        return f"{prompt}\n{prompt_append}" if prompt_append else prompt
 
-        # Add current task
-        prompt += "Now summarize these texts:\n"
-        for i, text in enumerate(texts, 1):
-            prompt += f"- {text}\n"
+    def _fits(self, prompt: str) -> bool:
+        return count_tokens(prompt, self.model) <= self.token_budget
 
-        prompt += "\nProvide a concise summary:"
-        return prompt
+    def collapse_duplicates(self, texts: List[str]) -> List[str]:
+        """Collapse near-duplicate texts into one, marked with how often it was given"""
+        if self.dedupe_threshold is None:
+            return list(texts)
+        return [text if count == 1 else f"{text} (×{count})"
+                for text, count in collapse_near_duplicates(texts, self.dedupe_threshold)]
 
     def summarize_texts(self, texts: List[str], prompt_append: str = "") -> str:
-        """Summarize a list of texts"""
-        prompt = self.create_prompt(texts)
+        """
+        Summarize a list of texts.
+
+        Near-duplicates are collapsed first. Groups whose prompt exceeds the
+        token budget are split into chunks that fit, summarized in parallel
+        and merged hierarchically.
+        """
+        return self._summarize(self.collapse_duplicates(texts), prompt_append)
+
+    def _summarize(self, texts: List[str], prompt_append: str) -> str:
+        prompt = self._with_append(self.create_prompt(texts), prompt_append)
+        if len(texts) < 2 or self._fits(prompt):
+            return self._complete(prompt)
+
+        # Examples picked per chunk are not in the empty prompt; reserve their budget
+        reserved = self.example_index.token_budget if self.example_index is not None else 0
+        chunks = self._chunk(texts, self._with_append(self.create_prompt([]), prompt_append), reserved)
+        print(f"    ✂️  {len(texts)} texts exceed the token budget; summarizing {len(chunks)} chunks")
+        partials = self._map(lambda chunk: self._summarize(chunk, prompt_append), chunks)
+        return self._reduce(partials, prompt_append)
+
+    def update_summary(self, previous_summary: str, new_texts: List[str], prompt_append: str = "") -> str:
+        """Update a previous summary with new texts only (instead of resending all texts)"""
+        new_texts = self.collapse_duplicates(new_texts)
+        prompt = self._with_append(self.create_update_prompt(previous_summary, new_texts), prompt_append)
+        if self._fits(prompt):
+            return self._complete(prompt)
+
+        new_summary = self._summarize(new_texts, prompt_append)
+        if new_summary.startswith("Error:"):
+            return new_summary
+        return self._reduce([previous_summary, new_summary], prompt_append)
+
+    def merge_summaries(self, summaries: List[str], prompt_append: str = "") -> str:
+        """Summarize several summaries (e.g. of subgroups) into one"""
+        return self._reduce(summaries, prompt_append)
+
+    def _reduce(self, summaries: List[str], prompt_append: str) -> str:
+        """Merge partial summaries, in rounds of budget-sized chunks if needed"""
+        errors = [summary for summary in summaries if summary.startswith("Error:")]
+        if errors:
+            return errors[0]
+        prompt = self._with_append(self.create_reduce_prompt(summaries), prompt_append)
+        if len(summaries) < 2 or self._fits(prompt):
+            return self._complete(prompt)
 
-        if prompt_append:
-            prompt += f"\n{prompt_append}"
+        chunks = self._chunk(summaries, self._with_append(self.create_reduce_prompt([]), prompt_append))
+        if len(chunks) >= len(summaries):
+            # Summaries too long to pair up within the budget; merge them in one go
+            return self._complete(prompt)
+        return self._reduce(self._map(lambda chunk: self._reduce(chunk, prompt_append), chunks),
+                            prompt_append)
+
+    def _chunk(self, texts: List[str], empty_prompt: str, reserved: int = 0) -> List[List[str]]:
+        """Split texts into consecutive chunks whose prompts fit the token budget"""
+        available = self.token_budget - count_tokens(empty_prompt, self.model) - reserved
+        chunks, chunk, used = [], [], 0
+        for text in texts:
+            tokens = count_tokens(text, self.model) + 2
+            if chunk and used + tokens > available:
+                chunks.append(chunk)
+                chunk, used = [], 0
+            chunk.append(text)
+            used += tokens
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    def _map(self, summarize, chunks: List[List[str]]) -> List[str]:
+        """Summarize chunks in parallel, keeping their order"""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(summarize, chunks))
+
+    def _complete(self, prompt: str) -> str:
+        """Send a prompt, going through the summary cache"""
+        cache_key = self._cache_key(prompt)
+        if self.use_cache:
+            cached = self.summary_cache.get(cache_key)
+            telemetry.record_cache('summary', cached is not None)
+            with self._stats_lock:
+                if cached is not None:
+                    self.cache_hits += 1
+                    return cached
+                self.cache_misses += 1
 
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=300,
-                temperature=0.3
-            )
-            return response.choices[0].message.content.strip()
+            summary = self.llm.complete(prompt, max_tokens=self.max_tokens,
+                                        temperature=self.temperature, model=self.model)
         except Exception as e:
+            # Errors are not cached so the next run retries
             return f"Error: {str(e)}"
 
+        if self.use_cache:
+            self.summary_cache[cache_key] = summary
+        return summary
+
+    def flush_cache(self):
+        """Write buffered summaries to disk"""
+        if hasattr(self.summary_cache, 'flush'):
+            self.summary_cache.flush()
+
+    def cache_stats(self) -> Dict:
+        """Summary cache hit/miss counts for this summarizer"""
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "hit_rate": round(self.cache_hits / lookups, 3) if lookups else None,
+        }
+
     def process_dataframe(self, df: pd.DataFrame, text_column: str) -> Dict:
         """Process pandas DataFrame column and return summary"""
         texts = df[text_column].dropna().tolist()
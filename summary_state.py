@@ -0,0 +1,41 @@
+import hashlib
+import json
+from typing import Dict, List, Optional
+import config
+from cache_store import open_cache_store
+
+
+class GroupSummaryState:
+    """
+    Per-group record of which feedback rows the last summary covered.
+
+    Each entry holds the group's row IDs, their fingerprint, the prompt the
+    summary was made with and the summary itself, so a later run can tell
+    whether a group is unchanged, only gained rows, or has to be redone.
+    """
+
+    def __init__(self, path: str = config.SUMMARY_STATE_FILE):
+        self.store = open_cache_store(path)
+
+    @staticmethod
+    def fingerprint(row_ids: List[int]) -> str:
+        """Order-independent fingerprint of a group's row IDs"""
+        return hashlib.sha1(",".join(map(str, sorted(row_ids))).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def key(scope: str, agg_cols, group) -> str:
+        return "group::" + json.dumps([scope, agg_cols, group], default=str)
+
+    def get(self, key: str) -> Optional[Dict]:
+        return self.store.get(key)
+
+    def record(self, key: str, row_ids: List[int], prompt_hash: str, summary: str):
+        self.store[key] = {
+            'fingerprint': self.fingerprint(row_ids),
+            'row_ids': sorted(row_ids),
+            'prompt': prompt_hash,
+            'summary': summary,
+        }
+
+    def flush(self):
+        self.store.flush()
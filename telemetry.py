@@ -0,0 +1,201 @@
+import contextlib
+import csv
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+import numpy as np
+import config
+
+# USD per 1M tokens: (input, cached input, output)
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+}
+
+
+class Telemetry:
+    """
+    Process-wide record of every LLM call and cache lookup, grouped by
+    pipeline stage.
+
+    The stage is set by `with telemetry.stage(name):` around each step of
+    the pipeline. Stages run one after another, so the current stage is
+    process-global rather than per-thread; calls made from worker threads
+    and event loops are attributed to the stage that started them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stage = "unstaged"
+        self._stage_seconds: Dict[str, float] = defaultdict(float)
+        self._calls: Dict[tuple, List[Dict]] = defaultdict(list)
+        self._short_circuits: Dict[tuple, int] = defaultdict(int)
+        self._caches: Dict[tuple, Dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0})
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """Attribute calls and cache lookups inside the block to `name`"""
+        with self._lock:
+            previous, self._stage = self._stage, name
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._stage_seconds[name] += time.perf_counter() - started
+                self._stage = previous
+
+    def record_call(self, model: str, latency: float, retries: int = 0, usage=None,
+                    throttled: float = 0.0, error: Optional[Exception] = None):
+        """
+        Record one LLM call.
+
+        Args:
+            latency: Seconds from the first attempt to the final response or error
+            retries: Attempts beyond the first
+            usage: The response's `usage` object (None for failed calls)
+            throttled: Seconds spent waiting on the rate limiter
+        """
+        details = getattr(usage, "prompt_tokens_details", None)
+        call = {
+            "latency": latency,
+            "retries": retries,
+            "throttled": throttled,
+            "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+            "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+            "cached_tokens": getattr(details, "cached_tokens", 0) or 0,
+            "error": type(error).__name__ if error is not None else None,
+        }
+        with self._lock:
+            self._calls[(self._stage, model)].append(call)
+
+    def record_short_circuit(self, model: str):
+        """Record a call refused by the open circuit breaker (never sent, so not a call)"""
+        with self._lock:
+            self._short_circuits[(self._stage, model)] += 1
+
+    def record_cache(self, cache: str, hit: bool):
+        """Record a lookup in the named cache"""
+        with self._lock:
+            self._caches[(self._stage, cache)]["hits" if hit else "misses"] += 1
+
+    @staticmethod
+    def cost(model: str, prompt_tokens: int, cached_tokens: int, completion_tokens: int) -> Optional[float]:
+        """Estimated USD cost, or None for models without a price"""
+        if model not in MODEL_PRICES:
+            return None
+        input_price, cached_price, output_price = MODEL_PRICES[model]
+        return ((prompt_tokens - cached_tokens) * input_price + cached_tokens * cached_price
+                + completion_tokens * output_price) / 1_000_000
+
+    def call_rows(self) -> List[Dict]:
+        """One row of call statistics per (stage, model)"""
+        with self._lock:
+            groups = {key: list(calls) for key, calls in self._calls.items()}
+            short_circuits = dict(self._short_circuits)
+        rows = []
+        for key in list(groups) + [key for key in short_circuits if key not in groups]:
+            stage, model = key
+            calls = groups.get(key, [])
+            latencies = np.array([call["latency"] for call in calls])
+            totals = {field: sum(call[field] for call in calls)
+                      for field in ("prompt_tokens", "completion_tokens", "cached_tokens", "retries")}
+            cost = self.cost(model, totals["prompt_tokens"], totals["cached_tokens"],
+                             totals["completion_tokens"])
+            rows.append({
+                "stage": stage,
+                "model": model,
+                "calls": len(calls),
+                "errors": sum(call["error"] is not None for call in calls),
+                "short_circuited": short_circuits.get(key, 0),
+                **totals,
+                **self._latency_stats(latencies),
+                "throttled_total": round(sum(call["throttled"] for call in calls), 3),
+                "cost_usd": round(cost, 4) if cost is not None else None,
+            })
+        return rows
+
+    @staticmethod
+    def _latency_stats(latencies: np.ndarray) -> Dict[str, Optional[float]]:
+        """Latency percentiles, max and total (None when there were no calls)"""
+        if not len(latencies):
+            return dict.fromkeys(["latency_p50", "latency_p90", "latency_p99",
+                                  "latency_max", "latency_total"])
+        return {
+            "latency_p50": round(float(np.percentile(latencies, 50)), 3),
+            "latency_p90": round(float(np.percentile(latencies, 90)), 3),
+            "latency_p99": round(float(np.percentile(latencies, 99)), 3),
+            "latency_max": round(float(latencies.max()), 3),
+            "latency_total": round(float(latencies.sum()), 3),
+        }
+
+    def cache_rows(self) -> List[Dict]:
+        """One row of hit/miss counts per (stage, cache)"""
+        with self._lock:
+            groups = {key: dict(counts) for key, counts in self._caches.items()}
+        rows = []
+        for (stage, cache), counts in groups.items():
+            lookups = counts["hits"] + counts["misses"]
+            rows.append({
+                "stage": stage,
+                "cache": cache,
+                **counts,
+                "hit_rate": round(counts["hits"] / lookups, 3) if lookups else None,
+            })
+        return rows
+
+    def report(self) -> Dict:
+        calls, caches = self.call_rows(), self.cache_rows()
+        with self._lock:
+            stage_seconds = {stage: round(seconds, 3) for stage, seconds in self._stage_seconds.items()}
+        costs = [row["cost_usd"] for row in calls if row["cost_usd"] is not None]
+        return {
+            "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "stage_seconds": stage_seconds,
+            "totals": {
+                "calls": sum(row["calls"] for row in calls),
+                "errors": sum(row["errors"] for row in calls),
+                "short_circuited": sum(row["short_circuited"] for row in calls),
+                "retries": sum(row["retries"] for row in calls),
+                "prompt_tokens": sum(row["prompt_tokens"] for row in calls),
+                "completion_tokens": sum(row["completion_tokens"] for row in calls),
+                "cached_tokens": sum(row["cached_tokens"] for row in calls),
+                "cost_usd": round(sum(costs), 4),
+            },
+            "calls": calls,
+            "caches": caches,
+        }
+
+    def write_report(self, output_dir: str = config.OUTPUT_DIR) -> str:
+        """
+        Write llm_telemetry.json (full report) plus llm_calls.csv and
+        cache_lookups.csv (one row per stage) to output_dir.
+
+        Returns:
+            str: Path of the JSON report
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        report = self.report()
+        json_path = os.path.join(output_dir, "llm_telemetry.json")
+        with open(json_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        for filename, rows in (("llm_calls.csv", report["calls"]), ("cache_lookups.csv", report["caches"])):
+            with open(os.path.join(output_dir, filename), 'w', newline='') as f:
+                if rows:
+                    writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+                    writer.writeheader()
+                    writer.writerows(rows)
+        return json_path
+
+    def print_summary(self):
+        totals = self.report()["totals"]
+        print(f"   📈 {totals['calls']} LLM calls ({totals['errors']} failed, {totals['retries']} retries, "
+              f"{totals['short_circuited']} refused by the circuit breaker), "
+              f"{totals['prompt_tokens']} prompt / {totals['completion_tokens']} completion tokens "
+              f"({totals['cached_tokens']} cached), ~${totals['cost_usd']}")
+
+
+telemetry = Telemetry()
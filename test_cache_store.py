@@ -0,0 +1,66 @@
+import json
+from cache_store import JsonCacheStore, SQLiteCacheStore, open_cache_store
+
+
+def test_sqlite_writes_are_buffered_until_flush(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    store = SQLiteCacheStore(path, flush_every=10, flush_interval=3600)
+    store["a"] = {"value": 1}
+    assert store.get("a") == {"value": 1}
+    assert SQLiteCacheStore(path).get("a") is None
+
+    store.flush()
+    assert SQLiteCacheStore(path).get("a") == {"value": 1}
+
+
+def test_sqlite_flushes_after_flush_every_writes(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    store = SQLiteCacheStore(path, flush_every=3, flush_interval=3600)
+    for i in range(3):
+        store[f"k{i}"] = i
+    assert len(SQLiteCacheStore(path)) == 3
+
+
+def test_sqlite_evicts_least_recently_used(tmp_path, monkeypatch):
+    clock = iter(range(1000))
+    monkeypatch.setattr("cache_store.time.time", lambda: next(clock))
+    store = SQLiteCacheStore(str(tmp_path / "cache.sqlite"), flush_every=1, max_entries=2)
+    store["a"] = 1
+    store["b"] = 2
+    assert store.get("a") == 1
+    store["c"] = 3
+
+    assert dict(store.items()) == {"a": 1, "c": 3}
+
+
+def test_json_store_evicts_least_recently_used_on_flush(tmp_path):
+    path = str(tmp_path / "cache.json")
+    store = JsonCacheStore(path, flush_every=100, flush_interval=3600, max_entries=2)
+    store["a"] = 1
+    store["b"] = 2
+    store.get("a")
+    store["c"] = 3
+    store.flush()
+
+    with open(path) as f:
+        assert json.load(f) == {"a": 1, "c": 3}
+
+
+def test_legacy_json_is_migrated_into_new_sqlite_store(tmp_path):
+    legacy = tmp_path / "topic_cache.json"
+    legacy.write_text(json.dumps({"x": [1, 2], "y": "z"}))
+    path = str(tmp_path / "cache.sqlite")
+
+    store = open_cache_store(path, legacy_json=str(legacy))
+    assert dict(store.items()) == {"x": [1, 2], "y": "z"}
+
+    # Entries already in the store are not overwritten by a later migration
+    store["x"] = "new"
+    store.flush()
+    assert store.migrate_json(str(legacy)) == 0
+    assert store.get("x") == "new"
+
+
+def test_open_cache_store_picks_backend_by_extension(tmp_path):
+    assert isinstance(open_cache_store(str(tmp_path / "c.json")), JsonCacheStore)
+    assert isinstance(open_cache_store(str(tmp_path / "c.sqlite")), SQLiteCacheStore)
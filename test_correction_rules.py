@@ -0,0 +1,40 @@
+from datetime import datetime
+import pandas as pd
+from correction_rules import (CORRECTION_RULES, SEMINAR_GUIDE_COL, CorrectionRule,
+                              apply_rules, scale_by, set_value)
+
+COMFORT_COL = 'I felt comfortable as a student in this Seminar.'
+
+
+def responses():
+    return pd.DataFrame({
+        'Timestamp': pd.to_datetime(['2025-08-12 23:59:59', '2025-08-13 00:00:00', '2025-08-19 00:00:00', '2025-08-20 00:00:00']),
+        COMFORT_COL: pd.Series([4, 8, None, 10], dtype='float64'),
+        SEMINAR_GUIDE_COL: ['N/A', 'Ann', 'N/A', 'N/A'],
+    })
+
+
+def test_historical_corrections_apply_within_their_windows():
+    df = apply_rules(responses())
+    assert df[COMFORT_COL].tolist()[:2] == [8, 8]
+    assert df[COMFORT_COL].isna().tolist() == [False, False, True, False]
+    assert df[SEMINAR_GUIDE_COL].tolist() == ['Megan Hanley', 'Ann', 'Megan Hanley', 'N/A']
+
+
+def test_rules_match_the_imperative_corrections():
+    expected = responses()
+    before_rescale = expected['Timestamp'] < datetime(2025, 8, 13)
+    expected.loc[before_rescale, COMFORT_COL] *= 2
+    na_guide = (expected['Timestamp'] < datetime(2025, 8, 20)) & (expected[SEMINAR_GUIDE_COL] == 'N/A')
+    expected.loc[na_guide, SEMINAR_GUIDE_COL] = 'Megan Hanley'
+
+    pd.testing.assert_frame_equal(apply_rules(responses(), CORRECTION_RULES), expected)
+
+
+def test_rules_skip_missing_columns_and_empty_windows():
+    rules = [
+        CorrectionRule(name='missing', columns=['not a column'], transform=scale_by(2)),
+        CorrectionRule(name='future', columns=[SEMINAR_GUIDE_COL], transform=set_value('X'),
+                       start=datetime(2030, 1, 1)),
+    ]
+    pd.testing.assert_frame_equal(apply_rules(responses(), rules), responses())
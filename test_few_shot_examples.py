@@ -0,0 +1,39 @@
+from few_shot_examples import FewShotIndex
+from summarizer import SimpleTextSummarizer
+
+
+def examples(texts):
+    return [{"texts": texts, "summary": "Engaging guide"},
+            {"texts": ["Too fast"], "summary": "Pace issues"}]
+
+
+def test_settings_hash_ignores_new_feedback_texts():
+    summarizer = SimpleTextSummarizer(api_key="test-key", use_cache=False)
+    summarizer.set_example_index(FewShotIndex(examples(["Fun demos"])))
+    before = summarizer.settings_hash()
+
+    summarizer.set_example_index(FewShotIndex(examples(["Fun demos", "A new response"])))
+    assert summarizer.settings_hash() == before
+
+    summarizer.set_example_index(FewShotIndex(examples(["Fun demos"]), k=2))
+    assert summarizer.settings_hash() != before
+    changed = examples(["Fun demos"])
+    changed[0]["summary"] = "Very engaging guide"
+    summarizer.set_example_index(FewShotIndex(changed))
+    assert summarizer.settings_hash() != before
+
+
+def test_long_examples_are_capped_to_fit_the_budget():
+    long_texts = [f"Response {i}: the guide explained volcanoes with great demos" for i in range(200)]
+    index = FewShotIndex(examples(long_texts), k=3, token_budget=300)
+
+    assert all(tokens <= 100 for tokens in index.tokens)
+    assert 0 < len(index.examples[0]["texts"]) < len(long_texts)
+    assert [example["summary"] for example in index.select(["volcanoes demos"])] == [
+        "Engaging guide", "Pace issues"]
+
+
+def test_examples_whose_summary_is_too_long_are_dropped():
+    index = FewShotIndex([{"texts": ["Fun"], "summary": "word " * 500}], token_budget=300)
+    assert index.examples == []
+    assert index.select(["Fun"]) == []
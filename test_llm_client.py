@@ -0,0 +1,68 @@
+import types
+import openai
+import pytest
+from llm_client import CircuitOpenError, LLMClient
+from rate_limiter import RateLimiter
+
+
+def api_error(error_class, status, headers=None):
+    response = types.SimpleNamespace(status_code=status, headers=headers or {}, request=None)
+    return error_class("error", response=response, body=None)
+
+
+def client_with(outcomes, **kwargs):
+    """LLMClient whose API calls raise or return the given outcomes in turn"""
+    outcomes = iter(outcomes)
+
+    def create(**request):
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return types.SimpleNamespace(usage=None, choices=[
+            types.SimpleNamespace(message=types.SimpleNamespace(content=outcome))])
+
+    llm = LLMClient("test-key", RateLimiter(10**6, 10**9), base_delay=0, **kwargs)
+    llm.client = types.SimpleNamespace(chat=types.SimpleNamespace(
+        completions=types.SimpleNamespace(create=create)))
+    return llm
+
+
+def test_transient_errors_are_retried():
+    llm = client_with([api_error(openai.InternalServerError, 500),
+                       api_error(openai.RateLimitError, 429), " ok "])
+    assert llm.complete("prompt", max_tokens=5, temperature=0) == "ok"
+
+
+def test_client_errors_are_not_retried_and_do_not_trip_the_breaker():
+    bad_request = api_error(openai.BadRequestError, 400)
+    llm = client_with([bad_request] * 3 + ["ok"], failure_threshold=2)
+    for _ in range(3):
+        with pytest.raises(openai.BadRequestError):
+            llm.complete("prompt", max_tokens=5, temperature=0)
+    assert llm.complete("prompt", max_tokens=5, temperature=0) == "ok"
+
+
+def test_circuit_opens_then_lets_one_trial_call_through(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("llm_client.time.monotonic", lambda: now[0])
+    down = api_error(openai.InternalServerError, 500)
+    llm = client_with([down, down, "ok", "again"], max_retries=0, failure_threshold=2,
+                      reset_timeout=60)
+
+    for _ in range(2):
+        with pytest.raises(openai.InternalServerError):
+            llm.complete("prompt", max_tokens=5, temperature=0)
+    with pytest.raises(CircuitOpenError):
+        llm.complete("prompt", max_tokens=5, temperature=0)
+
+    # After the cool-down a successful trial call closes the circuit again
+    now[0] = 61.0
+    assert llm.complete("prompt", max_tokens=5, temperature=0) == "ok"
+    assert llm.complete("prompt", max_tokens=5, temperature=0) == "again"
+
+
+def test_retry_after_header_is_honoured():
+    llm = LLMClient("test-key", RateLimiter(10**6, 10**9), max_delay=60)
+    assert llm._retry_delay(api_error(openai.RateLimitError, 429, {"retry-after": "7"}), 0) == 7
+    assert llm._retry_delay(api_error(openai.RateLimitError, 429, {"retry-after-ms": "250"}), 0) == 0.25
+    assert 0 <= llm._retry_delay(api_error(openai.RateLimitError, 429), 3) <= 8
@@ -0,0 +1,136 @@
+import pandas as pd
+from response_store import ResponseStore
+
+
+def sheet(rows):
+    return pd.DataFrame(rows, columns=['Timestamp', 'Guide'])
+
+
+def stored(store, title='Form'):
+    return store.load(title)[['Timestamp', 'Guide']].values.tolist()
+
+
+def test_merge_appends_only_new_rows(tmp_path):
+    store = ResponseStore(str(tmp_path))
+    assert store.merge('Form', sheet([['1/1/2025 10:00:00', 'Ann']]), sheet_rows=1) == 1
+    rows = sheet([['1/1/2025 10:00:00', 'Ann'], ['1/2/2025 10:00:00', 'Bob']])
+    assert store.merge('Form', rows, sheet_rows=2) == 1
+
+    assert stored(store) == [['1/1/2025 10:00:00', 'Ann'], ['1/2/2025 10:00:00', 'Bob']]
+    assert store.sheet_rows('Form') == 2
+    assert store.last_timestamp('Form') == '1/2/2025 10:00:00'
+
+
+def test_full_read_replaces_edited_row(tmp_path):
+    store = ResponseStore(str(tmp_path))
+    store.merge('Form', sheet([['1/1/2025 10:00:00', 'N/A'], ['1/2/2025 10:00:00', 'Bob']]), replace=True)
+    edited = sheet([['1/1/2025 10:00:00', 'Alice'], ['1/2/2025 10:00:00', 'Bob']])
+    assert store.merge('Form', edited, replace=True) == 1
+
+    assert stored(store) == [['1/1/2025 10:00:00', 'Alice'], ['1/2/2025 10:00:00', 'Bob']]
+
+
+def test_row_edited_back_to_an_earlier_version(tmp_path):
+    store = ResponseStore(str(tmp_path))
+    for guide in ['Ann', 'Bob', 'Ann']:
+        store.merge('Form', sheet([['1/1/2025 10:00:00', guide]]), replace=True)
+    assert stored(store) == [['1/1/2025 10:00:00', 'Ann']]
+
+
+def test_appended_rows_with_the_same_timestamp_are_kept(tmp_path):
+    store = ResponseStore(str(tmp_path))
+    store.merge('Form', sheet([['1/1/2025 10:00:00', 'Ann']]))
+    assert store.merge('Form', sheet([['1/1/2025 10:00:00', 'Bob']])) == 1
+
+    assert stored(store) == [['1/1/2025 10:00:00', 'Ann'], ['1/1/2025 10:00:00', 'Bob']]
+
+
+def test_replace_drops_rows_deleted_from_the_sheet(tmp_path):
+    store = ResponseStore(str(tmp_path))
+    store.merge('Form', sheet([['1/1/2025 10:00:00', 'Ann'], ['1/2/2025 10:00:00', 'Bob']]), sheet_rows=2)
+    added = store.merge('Form', sheet([['1/2/2025 10:00:00', 'Bob'], ['1/3/2025 10:00:00', 'Cy']]),
+                        sheet_rows=2, replace=True)
+
+    assert added == 1
+    assert stored(store) == [['1/2/2025 10:00:00', 'Bob'], ['1/3/2025 10:00:00', 'Cy']]
+    assert len(list((tmp_path / 'form').glob('*.parquet'))) == 1
+
+
+def test_fragments_with_new_questions_are_combined(tmp_path):
+    store = ResponseStore(str(tmp_path))
+    store.merge('Form', sheet([['1/1/2025 10:00:00', 'Ann']]))
+    store.merge('Form', pd.DataFrame({'Timestamp': ['1/2/2025 10:00:00'], 'Guide': ['Bob'],
+                                      'New question': ['yes']}))
+
+    df = store.load('Form')
+    assert df['New question'].isna().tolist() == [True, False]
+    assert df['New question'].iloc[1] == 'yes'
+
+
+class FakeWorksheet:
+    """Just enough of a pygsheets worksheet for read_responses.get_responses"""
+
+    def __init__(self, rows):
+        self.data = [['Timestamp', 'Guide']] + rows
+
+    @property
+    def rows(self):
+        return len(self.data)
+
+    def get_row(self, row, **kwargs):
+        return self.data[row - 1]
+
+    def get_values(self, start, end, **kwargs):
+        return self.data[start[0] - 1:end[0]]
+
+
+class FakeClient:
+    def __init__(self, worksheet):
+        self.worksheet = worksheet
+
+    def open(self, title):
+        return self
+
+    def worksheet_by_title(self, title):
+        return self.worksheet
+
+
+def test_tail_read_falls_back_to_full_read_after_deletions(tmp_path):
+    from read_responses import get_responses
+    store = ResponseStore(str(tmp_path))
+    wks = FakeWorksheet([['1/1/2025 10:00:00', 'Ann'], ['1/2/2025 10:00:00', 'Bob']])
+    get_responses('Form', store=store, client=FakeClient(wks))
+
+    # A deleted row shifts the next response into a row the store has already read
+    del wks.data[1]
+    wks.data.append(['1/3/2025 10:00:00', 'Cy'])
+    df = get_responses('Form', store=store, client=FakeClient(wks))
+
+    assert df[['Timestamp', 'Guide']].values.tolist() == [
+        ['1/2/2025 10:00:00', 'Bob'], ['1/3/2025 10:00:00', 'Cy']]
+
+
+def test_tail_read_fetches_only_new_rows(tmp_path):
+    from read_responses import get_responses
+    store = ResponseStore(str(tmp_path))
+    wks = FakeWorksheet([['1/1/2025 10:00:00', 'Ann']])
+    get_responses('Form', store=store, client=FakeClient(wks))
+
+    wks.data.append(['1/2/2025 10:00:00', 'Bob'])
+    df = get_responses('Form', store=store, client=FakeClient(wks))
+
+    assert df['Guide'].tolist() == ['Ann', 'Bob']
+    assert store.sheet_rows('Form') == 2
+
+
+def test_same_second_responses_across_two_runs_are_both_kept(tmp_path):
+    from read_responses import get_responses
+    store = ResponseStore(str(tmp_path))
+    wks = FakeWorksheet([['1/1/2025 10:00:00', 'Ann']])
+    get_responses('Form', store=store, client=FakeClient(wks))
+
+    wks.data.append(['1/1/2025 10:00:00', 'Bob'])
+    df = get_responses('Form', store=store, client=FakeClient(wks))
+
+    assert df['Guide'].tolist() == ['Ann', 'Bob']
+    assert store.sheet_rows('Form') == 2
@@ -1,3 +1,4 @@
+from rate_limiter import count_tokens
 from summarizer import SimpleTextSummarizer
 
 SAMPLE_TEXTS = [
@@ -21,5 +22,58 @@ def test_summarizer():
     return summary
 
 
+class FakeLLM:
+    """Records prompts and answers each with a short merged summary"""
+
+    def __init__(self):
+        self.prompts = []
+
+    def complete(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return f"merged {len(self.prompts)}"
+
+
+def offline_summarizer(token_budget):
+    return SimpleTextSummarizer(api_key="test-key", use_cache=False, token_budget=token_budget,
+                                max_workers=1, llm_client=FakeLLM())
+
+
+def test_chunks_keep_order_and_fit_the_budget():
+    summarizer = offline_summarizer(token_budget=80)
+    empty_prompt = "Summarize:"
+    chunks = summarizer._chunk(SAMPLE_TEXTS, empty_prompt)
+
+    assert [text for chunk in chunks for text in chunk] == SAMPLE_TEXTS
+    assert len(chunks) > 1
+    available = 80 - count_tokens(empty_prompt)
+    for chunk in chunks:
+        assert len(chunk) == 1 or sum(count_tokens(text) + 2 for text in chunk) <= available
+
+
+def test_oversized_text_gets_a_chunk_of_its_own():
+    summarizer = offline_summarizer(token_budget=40)
+    long_text = "word " * 200
+    assert summarizer._chunk(["short", long_text, "short"], "") == [["short"], [long_text], ["short"]]
+
+
+def test_reduce_returns_the_first_error_without_a_call():
+    summarizer = offline_summarizer(token_budget=12000)
+    assert summarizer._reduce(["ok", "Error: timeout", "Error: other"], "") == "Error: timeout"
+    assert summarizer.llm.prompts == []
+
+
+def test_reduce_merges_in_rounds_when_over_budget():
+    small = offline_summarizer(token_budget=12000)
+    assert small._reduce(SAMPLE_TEXTS, "") == "merged 1"
+
+    summarizer = offline_summarizer(token_budget=250)
+    summarizer._reduce(SAMPLE_TEXTS, "")
+    prompts = summarizer.llm.prompts
+    assert len(prompts) > 2
+    assert all(count_tokens(prompt) <= 250 for prompt in prompts)
+    # Every partial summary makes it into exactly one first-round prompt
+    assert sorted(sum(text in prompt for prompt in prompts) for text in SAMPLE_TEXTS) == [1] * 10
+
+
 if __name__ == "__main__":
     test_summarizer()
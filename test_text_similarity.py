@@ -0,0 +1,35 @@
+from text_similarity import canonicalize_topic, collapse_near_duplicates
+
+
+def test_canonicalize_topic_folds_case_unicode_and_punctuation():
+    assert canonicalize_topic("  Black-Holes!! ") == "black holes"
+    assert canonicalize_topic("ＢＬＡＣＫ　Holes") == "black holes"
+    assert canonicalize_topic("Straße") == canonicalize_topic("STRASSE")
+
+
+def test_canonicalize_topic_keeps_punctuation_only_text():
+    assert canonicalize_topic("?!") == "?!"
+
+
+def test_canonicalize_topic_maps_aliases_after_normalizing():
+    aliases = {"space": "astronomy"}
+    assert canonicalize_topic("SPACE!", aliases) == "astronomy"
+    assert canonicalize_topic("Volcanoes", aliases) == "volcanoes"
+
+
+def test_collapse_near_duplicates_merges_normalized_and_similar_texts():
+    texts = ["Great seminar!", "great seminar", "Great seminar!!", "Great seminr",
+             "The volcano demo was loud"]
+    assert collapse_near_duplicates(texts, threshold=0.6) == [
+        ("Great seminar!", 4), ("The volcano demo was loud", 1)]
+
+
+def test_collapse_near_duplicates_uses_most_frequent_text_as_representative():
+    texts = ["Loved it, thanks so much", "Loved it, thanks", "loved it thanks!", "Loved it thanks"]
+    assert collapse_near_duplicates(texts, threshold=0.5) == [("Loved it, thanks", 4)]
+
+
+def test_collapse_near_duplicates_keeps_distinct_texts_apart():
+    assert collapse_near_duplicates(["Volcanoes", "Origami", "Volcanoes"]) == [
+        ("Volcanoes", 2), ("Origami", 1)]
+    assert collapse_near_duplicates([]) == []
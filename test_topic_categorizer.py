@@ -0,0 +1,67 @@
+import types
+import pandas as pd
+from llm_client import LLMClient
+from rate_limiter import RateLimiter
+from topic_categorizer import TopicCategorizer
+
+
+def categorizer(cache_file, calls):
+    """TopicCategorizer whose LLM always answers with reference topic 1"""
+    def create(**request):
+        calls.append(request)
+        return types.SimpleNamespace(usage=None, choices=[
+            types.SimpleNamespace(message=types.SimpleNamespace(content="1"))])
+
+    llm = LLMClient("test-key", RateLimiter(10**6, 10**9))
+    llm.client = types.SimpleNamespace(chat=types.SimpleNamespace(
+        completions=types.SimpleNamespace(create=create)))
+    return TopicCategorizer(api_key="test-key", cache_file=cache_file, aliases_file=None,
+                            llm_client=llm)
+
+
+def test_recurring_topic_is_cached_across_many_week_windows(tmp_path):
+    weeks = pd.date_range('2025-01-06', periods=20, freq='W-MON')
+    schedule = pd.DataFrame({'week_start': weeks,
+                             'topic': [f'Scheduled topic {i}' for i in range(20)]})
+    df = pd.DataFrame({'topic': ['my own free text topic'] * 20, 'week_start': weeks})
+    cache_file = str(tmp_path / "topics.sqlite")
+
+    for expected_calls in (20, 0, 0):
+        calls = []
+        topics = categorizer(cache_file, calls)
+        result = topics.categorize_dataframe_topics(
+            df.copy(), schedule['topic'].tolist(), reference_schedule=schedule)
+        topics._save_cache()
+        assert len(calls) == expected_calls
+        assert result['matched_topic'].notna().all()
+
+
+def test_failed_requests_are_not_cached(tmp_path):
+    calls = []
+    topics = categorizer(str(tmp_path / "topics.sqlite"), calls)
+    topics.llm.max_retries = 0
+    working_create = topics.llm.client.chat.completions.create
+
+    def failing_create(**request):
+        raise RuntimeError("API down")
+    topics.llm.client.chat.completions.create = failing_create
+    assert topics.find_closest_topic('rocks', ['Geology', 'Space']) == (None, 'api_error')
+
+    topics.llm.client.chat.completions.create = working_create
+    assert topics.find_closest_topic('rocks', ['Geology', 'Space']) == ('Geology', 'high')
+
+
+def test_batch_answers_fall_back_per_item(tmp_path):
+    topics = categorizer(str(tmp_path / "topics.sqlite"), [])
+    references = ['Geology', 'Space']
+    results, failed = topics._parse_batch_answers(
+        ['rocks', 'stars', 'knitting', 'poems'], '{"T1": 1, "T2": "two", "T3": 0, "T4": 9}', references)
+
+    assert results == {'rocks': ('Geology', 'high'), 'knitting': (None, 'no_match')}
+    assert failed == ['stars', 'poems']
+
+
+def test_unparseable_batch_falls_back_for_every_item(tmp_path):
+    topics = categorizer(str(tmp_path / "topics.sqlite"), [])
+    for content in ('not json', '[1, 2]', None):
+        assert topics._parse_batch_answers(['rocks', 'stars'], content, ['Geology']) == ({}, ['rocks', 'stars'])
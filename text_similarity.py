@@ -0,0 +1,113 @@
+import re
+import unicodedata
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and collapse punctuation/whitespace runs to single spaces."""
+    return re.sub(r'[\W_]+', ' ', str(text).lower()).strip()
+
+
+def canonicalize_topic(text: str, aliases: Optional[Dict[str, str]] = None) -> str:
+    """
+    Canonical form of a free-text topic: NFKC-normalized, case-folded, with
+    punctuation and whitespace runs collapsed, then mapped through `aliases`
+    (canonical variant -> canonical topic) if given.
+    """
+    text = unicodedata.normalize('NFKC', str(text)).casefold()
+    canonical = re.sub(r'[\W_]+', ' ', text).strip() or ' '.join(text.split())
+    if aliases:
+        canonical = aliases.get(canonical, canonical)
+    return canonical
+
+
+def char_ngrams(text: str, n: int = 3) -> List[str]:
+    """Character n-grams of the normalized text, padded so word edges count."""
+    padded = f" {normalize_text(text)} "
+    return [padded[i:i + n] for i in range(max(len(padded) - n + 1, 1))]
+
+
+def word_ngrams(text: str, n: int = 2) -> List[str]:
+    """Words and word n-grams (up to n) of the normalized text."""
+    words = normalize_text(text).split()
+    return [' '.join(words[i:i + size]) for size in range(1, n + 1)
+            for i in range(len(words) - size + 1)]
+
+
+class TfidfIndex:
+    """
+    Small in-memory TF-IDF index with cosine-similarity queries.
+
+    Documents are stored as a dense, L2-normalized NumPy matrix, which is
+    fine for the few hundred to few thousand documents this is used for.
+    """
+
+    def __init__(self, documents: List[str], analyzer: Callable[[str], List[str]] = char_ngrams):
+        self.documents = list(documents)
+        self.analyzer = analyzer
+        self.vocabulary = {}
+        doc_terms = [analyzer(doc) for doc in self.documents]
+        for terms in doc_terms:
+            for term in terms:
+                self.vocabulary.setdefault(term, len(self.vocabulary))
+
+        counts = self._count_matrix(doc_terms)
+        doc_freq = (counts > 0).sum(axis=0)
+        self.idf = (np.log((1 + len(self.documents)) / (1 + doc_freq)) + 1).astype(np.float32)
+        self.matrix = self._weight(counts)
+
+    def _count_matrix(self, doc_terms: List[List[str]]) -> np.ndarray:
+        counts = np.zeros((len(doc_terms), len(self.vocabulary)), dtype=np.float32)
+        for row, terms in enumerate(doc_terms):
+            ids = [self.vocabulary[term] for term in terms if term in self.vocabulary]
+            np.add.at(counts[row], ids, 1)
+        return counts
+
+    def _weight(self, counts: np.ndarray) -> np.ndarray:
+        """Sublinear TF x IDF, L2-normalized per row."""
+        weights = np.where(counts > 0, 1 + np.log(np.maximum(counts, 1)), 0) * self.idf
+        norms = np.linalg.norm(weights, axis=1, keepdims=True)
+        return weights / np.where(norms == 0, 1, norms)
+
+    def transform(self, texts: List[str]) -> np.ndarray:
+        """Vectorize texts against the index vocabulary (unknown terms are ignored)."""
+        return self._weight(self._count_matrix([self.analyzer(text) for text in texts]))
+
+    def similarities(self, texts: List[str]) -> np.ndarray:
+        """Cosine similarity of each text (rows) to each indexed document (columns)."""
+        if not self.documents:
+            return np.zeros((len(texts), 0), dtype=np.float32)
+        return self.transform(texts) @ self.matrix.T
+
+
+def collapse_near_duplicates(texts: List[str], threshold: float = 0.85) -> List[Tuple[str, int]]:
+    """
+    Collapse near-identical texts into (representative, count) pairs.
+
+    Texts equal after normalization are merged first; the remaining distinct
+    texts are clustered greedily by character n-gram TF-IDF cosine similarity
+    (>= threshold), starting from the most frequent, which becomes the
+    cluster's representative. Pairs keep the order of first appearance.
+    """
+    firsts, counts = {}, {}
+    for text in texts:
+        key = normalize_text(text)
+        firsts.setdefault(key, text)
+        counts[key] = counts.get(key, 0) + 1
+    keys = list(firsts)
+    if len(keys) < 2:
+        return [(firsts[key], counts[key]) for key in keys]
+
+    matrix = TfidfIndex(keys).matrix
+    similar = (matrix @ matrix.T) >= threshold
+    cluster = np.full(len(keys), -1)
+    for i in sorted(range(len(keys)), key=lambda i: -counts[keys[i]]):
+        if cluster[i] == -1:
+            cluster[(cluster == -1) & similar[i]] = i
+
+    # Roots in order of their cluster's first member (keys are in first-seen order)
+    totals = {}
+    for i, root in enumerate(cluster):
+        totals[root] = totals.get(root, 0) + counts[keys[i]]
+    return [(firsts[keys[root]], total) for root, total in totals.items()]
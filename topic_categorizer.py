@@ -1,54 +1,183 @@
+import numpy as np
 import pandas as pd
-from openai import OpenAI
+import asyncio
 import json
+import hashlib
 from typing import List, Dict, Optional, Tuple
 import os
+import atexit
 from dotenv import load_dotenv
+from cache_store import open_cache_store
+from text_similarity import TfidfIndex, canonicalize_topic
+from reference_topics import PLANNING_SHEET_URL, get_reference_provider
+from rate_limiter import RateLimiter
+from llm_client import LLMClient, get_shared_llm_client
+from telemetry import telemetry
 
 load_dotenv()
 
 
+# Bump when the layout of topic cache entries changes
+CACHE_SCHEMA_VERSION = 3
+
+
 class TopicCategorizer:
-    def __init__(self, api_key: str = os.getenv("OPENAI_API_KEY"), cache_file: str = "topic_cache.json", use_cache: bool = True):
+    # Results that reflect a failed request rather than an answer; never cached
+    TRANSIENT_RESULTS = ("api_error", "parse_error", "invalid_response")
+    # Reference sets indexed per topic for reuse when the reference list grows
+    # (the largest are kept); every result is also cached under its own key
+    MAX_REFERENCE_SETS = 8
+
+    def __init__(self, api_key: str = os.getenv("OPENAI_API_KEY"), cache_file: str = "topic_cache.sqlite", use_cache: bool = True,
+                 lexical_threshold: Optional[float] = 0.85, lexical_margin: float = 0.05,
+                 rate_limiter: Optional[RateLimiter] = None, aliases_file: Optional[str] = "topic_aliases.json",
+                 llm_client: Optional[LLMClient] = None):
+        """
+        Args:
+            cache_file: Topic cache; SQLite by default, or a .json file for the
+                legacy JSON backend. An existing topic_cache.json is migrated
+                into a new SQLite cache.
+            lexical_threshold: Minimum character n-gram TF-IDF similarity for a
+                topic to be matched locally without calling the LLM (None disables)
+            lexical_margin: Required lead of the best lexical match over the runner-up
+            rate_limiter: Requests/tokens-per-minute limiter (defaults to the shared one)
+            llm_client: Client with retries and circuit breaker (defaults to the
+                shared one, or one using rate_limiter if given)
+            aliases_file: Optional JSON object mapping topic variants to the topic
+                they should be treated as (e.g. {"bh": "black holes"})
+        """
         if api_key is None:
             raise ValueError(
                 "API key must be provided either as argument or OPENAI_API_KEY environment variable")
-        self.client = OpenAI(api_key=api_key)
+        self.api_key = api_key
+        self.llm = llm_client or (LLMClient(api_key, rate_limiter) if rate_limiter
+                                  else get_shared_llm_client(api_key))
         self.cache_file = cache_file
+        self.legacy_cache_file = "topic_cache.json"
         self.use_cache = use_cache
+        self.aliases = self._load_aliases(aliases_file)
         self.topic_cache = self._load_cache() if use_cache else {}
+        self._reference_sets: Dict[str, List[str]] = {}
+        self._upgrade_legacy_cache()
+        self.lexical_threshold = lexical_threshold
+        self.lexical_margin = lexical_margin
+        self._lexical_indexes: Dict[Tuple[str, ...], TfidfIndex] = {}
+
+    def _load_cache(self):
+        """Open the topic cache store, migrating the legacy JSON cache if present"""
+        try:
+            store = open_cache_store(self.cache_file, legacy_json=self.legacy_cache_file)
+        except Exception as e:
+            print(f"Warning: Could not open cache {self.cache_file}: {e}")
+            return {}
+        # Flush any buffered entries if the process exits mid-run
+        atexit.register(store.flush)
+        return store
+
+    def _load_aliases(self, aliases_file: Optional[str]) -> Dict[str, str]:
+        """Load the topic alias table, keyed and valued by canonical form"""
+        if not aliases_file or not os.path.exists(aliases_file):
+            return {}
+        try:
+            with open(aliases_file, 'r') as f:
+                aliases = json.load(f)
+        except Exception as e:
+            print(f"Warning: Could not load topic aliases: {e}")
+            return {}
+        return {canonicalize_topic(variant): canonicalize_topic(topic)
+                for variant, topic in aliases.items()}
 
-    def _load_cache(self) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
-        """Load cached topic mappings from file"""
-        if os.path.exists(self.cache_file):
-            try:
-                with open(self.cache_file, 'r') as f:
-                    cache_data = json.load(f)
-                    # Convert list back to tuple for consistency
-                    return {k: tuple(v) if v else (None, None) for k, v in cache_data.items()}
-            except Exception as e:
-                print(f"Warning: Could not load cache file: {e}")
-                return {}
-        return {}
+    def canonicalize(self, topic: str) -> str:
+        """Canonical form of a topic; spellings with the same form share one cache entry"""
+        return canonicalize_topic(topic, self.aliases)
 
     def _save_cache(self):
-        """Save topic mappings to cache file"""
-        if not self.use_cache:
+        """Flush buffered topic mappings to the cache store"""
+        if not self.use_cache or not hasattr(self.topic_cache, 'flush'):
             return
         try:
-            # Convert tuples to lists for JSON serialization
-            cache_data = {k: list(v) if v else None for k,
-                          v in self.topic_cache.items()}
-            with open(self.cache_file, 'w') as f:
-                json.dump(cache_data, f, indent=2)
+            self.topic_cache.flush()
         except Exception as e:
             print(f"Warning: Could not save cache file: {e}")
 
-    def _get_cache_key(self, topic: str, reference_topics: List[str]) -> str:
-        """Generate a cache key for a topic and reference topics combination"""
-        # Create a stable key based on topic and sorted reference topics
-        ref_topics_str = "|".join(sorted(reference_topics))
-        return f"{topic}:::{ref_topics_str}"
+    def _get_cache_key(self, topic: str) -> str:
+        """Generate a cache key for a topic (entries hold one result per reference set)"""
+        return f"topic::{self.canonicalize(topic)}"
+
+    def _get_result_key(self, topic: str, set_id: str) -> str:
+        """Cache key for a topic's result against one reference set"""
+        return f"match::{self.canonicalize(topic)}::{set_id}"
+
+    def _reference_set_id(self, reference_topics: List[str]) -> str:
+        """Stable ID for a reference list, registering the list in the cache"""
+        ref_set = sorted(set(reference_topics))
+        set_id = hashlib.sha1("\n".join(ref_set).encode('utf-8')).hexdigest()[:16]
+        if set_id not in self._reference_sets:
+            self._reference_sets[set_id] = ref_set
+            if self.use_cache and f"refset::{set_id}" not in self.topic_cache:
+                self.topic_cache[f"refset::{set_id}"] = ref_set
+        return set_id
+
+    def _get_reference_set(self, set_id: str) -> Optional[List[str]]:
+        if set_id not in self._reference_sets:
+            ref_set = self.topic_cache.get(f"refset::{set_id}")
+            if ref_set is None:
+                return None
+            self._reference_sets[set_id] = ref_set
+        return self._reference_sets[set_id]
+
+    def _upgrade_legacy_cache(self):
+        """
+        Convert 'topic:::ref1|ref2|...' entries to per-topic, per-reference-set
+        entries, and merge per-topic entries into their canonical keys.
+        """
+        if not self.use_cache or self.topic_cache.get("meta::schema_version") == CACHE_SCHEMA_VERSION:
+            return
+        upgraded = 0
+        for key, value in list(self.topic_cache.items()):
+            if key.startswith("topic::"):
+                if key == self._get_cache_key(key[len("topic::"):]):
+                    continue
+                topic, previous_entries = key[len("topic::"):], value
+            elif ":::" not in key or key.startswith(("refset::", "meta::", "match::")) or not value:
+                continue
+            else:
+                topic, ref_topics_str = key.split(":::", 1)
+                previous_entries = {self._reference_set_id(ref_topics_str.split("|")): list(value)}
+            entries = dict(self.topic_cache.get(self._get_cache_key(topic)) or {})
+            for set_id, result in previous_entries.items():
+                entries.setdefault(set_id, result)
+            self.topic_cache[self._get_cache_key(topic)] = entries
+            upgraded += 1
+        self.topic_cache["meta::schema_version"] = CACHE_SCHEMA_VERSION
+        self._save_cache()
+        if upgraded:
+            print(f"   📦 Upgraded {upgraded} legacy topic cache entries")
+
+    def lexical_match(self, topic: str, reference_topics: List[str]) -> Tuple[Optional[str], Optional[float]]:
+        """
+        Match a topic locally by character n-gram TF-IDF similarity.
+
+        Returns (reference topic, similarity) when the best match clears the
+        threshold with a clear lead over the runner-up, otherwise (None, None).
+        """
+        if self.lexical_threshold is None:
+            return None, None
+
+        ref_key = tuple(dict.fromkeys(reference_topics))
+        index = self._lexical_indexes.get(ref_key)
+        if index is None:
+            index = self._lexical_indexes[ref_key] = TfidfIndex(list(ref_key))
+
+        scores = index.similarities([topic])[0]
+        if not len(scores):
+            return None, None
+        ranked = scores.argsort()[::-1]
+        best = scores[ranked[0]]
+        runner_up = scores[ranked[1]] if len(ranked) > 1 else 0.0
+        if best >= self.lexical_threshold and best - runner_up >= self.lexical_margin:
+            return index.documents[ranked[0]], round(float(best), 3)
+        return None, None
 
     def create_categorization_prompt(self, topic: str, reference_topics: List[str]) -> str:
         """Create a prompt to find the closest matching topic"""
@@ -71,96 +200,424 @@ class TopicCategorizer:
 
         return prompt
 
+    def create_batch_categorization_prompt(self, topics: List[str], reference_topics: List[str]) -> str:
+        """Create a prompt to match several topics against one copy of the reference list"""
+        lines = [
+            "You are an expert at categorizing and matching topics. "
+            "For each topic below, find the closest semantic match in the list of reference topics. "
+            "Consider synonyms, related concepts, and broader/narrower topic relationships.\n",
+            "Reference topics to match against:"
+        ]
+        lines += [f"{i}. {ref_topic}" for i, ref_topic in enumerate(reference_topics, 1)]
+        lines.append("\nTopics to categorize:")
+        lines += [f"T{i}. '{topic}'" for i, topic in enumerate(topics, 1)]
+        lines.append(
+            "\nRespond with only a JSON object mapping each topic ID (T1, T2, etc.) to the number "
+            "of its closest matching reference topic, using 0 if no reasonable match exists. "
+            'Example: {"T1": 3, "T2": 0}'
+        )
+        return "\n".join(lines)
+
+    def _resolve_locally(self, topic: str, reference_topics: List[str]) -> Tuple[Optional[Tuple], List[str]]:
+        """
+        Resolve a topic by lexical match or cache.
+
+        Returns (result, None) when resolved, otherwise (None, candidates) where
+        candidates are the reference topics the LLM still has to choose from.
+        When the topic was categorized against an earlier, smaller reference
+        list, only the previous answer plus the newly added topics are candidates.
+        """
+        # Near-exact spellings are resolved locally; the score is the confidence
+        matched_topic, similarity = self.lexical_match(topic, reference_topics)
+        if matched_topic is not None:
+            print(f"    ≈ Lexical match for '{topic}' ({similarity})")
+            telemetry.record_cache('topic_lexical', True)
+            return (matched_topic, similarity), None
+        if self.lexical_threshold is not None:
+            telemetry.record_cache('topic_lexical', False)
+
+        # Check cache first if enabled
+        if not self.use_cache:
+            return None, reference_topics
+        entries = self.topic_cache.get(self._get_cache_key(topic)) or {}
+        set_id = self._reference_set_id(reference_topics)
+        cached = self.topic_cache.get(self._get_result_key(topic, set_id)) or entries.get(set_id)
+        if cached is not None and cached[1] not in self.TRANSIENT_RESULTS:
+            print(f"    ✓ Cache hit for '{topic}'")
+            telemetry.record_cache('topic', True)
+            return tuple(cached), None
+
+        # Reuse the answer for the largest earlier reference list contained in this one
+        current = set(reference_topics)
+        previous_refs, previous_result = set(), None
+        for previous_id, result in entries.items():
+            refs = self._get_reference_set(previous_id)
+            if (refs is None or result[1] in self.TRANSIENT_RESULTS
+                    or not set(refs) <= current or len(refs) <= len(previous_refs)):
+                continue
+            previous_refs, previous_result = set(refs), result
+        if previous_result is None:
+            telemetry.record_cache('topic', False)
+            return None, reference_topics
+
+        new_refs = list(dict.fromkeys(ref for ref in reference_topics if ref not in previous_refs))
+        telemetry.record_cache('topic', not new_refs)
+        if not new_refs:
+            return tuple(previous_result), None
+        print(f"    ↺ Cached match for '{topic}'; checking {len(new_refs)} new reference topics")
+        return None, ([previous_result[0]] if previous_result[0] else []) + new_refs
+
+    def _parse_match(self, result, candidates: List[str],
+                     n_references: Optional[int] = None) -> Tuple[Optional[str], Optional[str]]:
+        """Turn the model's reference number into a (topic, confidence) result"""
+        try:
+            match_index = int(result)
+        except (TypeError, ValueError):
+            return None, "parse_error"
+        if match_index == 0:
+            return None, "no_match"
+        if 1 <= match_index <= len(candidates):
+            # Simple confidence based on temperature and successful match
+            n_references = n_references or len(candidates)
+            confidence = "high" if n_references <= 10 else "medium"
+            return candidates[match_index - 1], confidence
+        return None, "invalid_response"
+
+    def _cache_result(self, topic: str, reference_topics: List[str], matched_result: Tuple):
+        """Cache the result if caching is enabled (the store batches writes to disk)"""
+        if self.use_cache and matched_result[1] not in self.TRANSIENT_RESULTS:
+            set_id = self._reference_set_id(reference_topics)
+            self.topic_cache[self._get_result_key(topic, set_id)] = list(matched_result)
+
+            cache_key = self._get_cache_key(topic)
+            entries = dict(self.topic_cache.get(cache_key) or {})
+            entries.pop(set_id, None)
+            entries[set_id] = list(matched_result)
+            if len(entries) > self.MAX_REFERENCE_SETS:
+                # Week windows come and go; keep the largest (then most recent) sets,
+                # which are the ones a growing reference list can reuse
+                by_size = sorted(reversed(list(entries)), reverse=True,
+                                 key=lambda sid: len(self._get_reference_set(sid) or ()))
+                keep = set(by_size[:self.MAX_REFERENCE_SETS])
+                entries = {sid: result for sid, result in entries.items() if sid in keep}
+            self.topic_cache[cache_key] = entries
+
     def find_closest_topic(self, topic: str, reference_topics: List[str]) -> Tuple[Optional[str], Optional[str]]:
         """Find the closest matching topic from the reference list"""
         if not topic or not reference_topics:
             return None, None
 
-        # Check cache first if enabled
-        if self.use_cache:
-            cache_key = self._get_cache_key(topic, reference_topics)
-            if cache_key in self.topic_cache:
-                print(f"    ✓ Cache hit for '{topic}'")
-                return self.topic_cache[cache_key]
+        local_result, candidates = self._resolve_locally(topic, reference_topics)
+        if local_result is not None:
+            return local_result
+        return self._match_single(topic, candidates, reference_topics)
 
-        prompt = self.create_categorization_prompt(topic, reference_topics)
+    def _match_single(self, topic: str, candidates: List[str], reference_topics: List[str]) -> Tuple:
+        """Ask the LLM to pick among candidates; the result is cached against reference_topics"""
+        prompt = self.create_categorization_prompt(topic, candidates)
 
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=10,
-                temperature=0.1
-            )
-
-            result = response.choices[0].message.content.strip()
-
-            try:
-                match_index = int(result)
-                if match_index == 0:
-                    matched_result = (None, "no_match")
-                elif 1 <= match_index <= len(reference_topics):
-                    # Simple confidence based on temperature and successful match
-                    confidence = "high" if len(
-                        reference_topics) <= 10 else "medium"
-                    matched_result = (
-                        reference_topics[match_index - 1], confidence)
-                else:
-                    matched_result = (None, "invalid_response")
-
-                # Cache the result if caching is enabled
-                if self.use_cache:
-                    cache_key = self._get_cache_key(topic, reference_topics)
-                    self.topic_cache[cache_key] = matched_result
-                    self._save_cache()
-                return matched_result
-            except ValueError:
-                matched_result = (None, "parse_error")
-                if self.use_cache:
-                    cache_key = self._get_cache_key(topic, reference_topics)
-                    self.topic_cache[cache_key] = matched_result
-                    self._save_cache()
-                return matched_result
+            result = self.llm.complete(prompt, max_tokens=10, temperature=0.1)
+            matched_result = self._parse_match(result, candidates, len(reference_topics))
 
         except Exception as e:
             print(f"Error categorizing topic '{topic}': {str(e)}")
             matched_result = (None, "api_error")
-            if self.use_cache:
-                cache_key = self._get_cache_key(topic, reference_topics)
-                self.topic_cache[cache_key] = matched_result
-                self._save_cache()
-            return matched_result
+
+        self._cache_result(topic, reference_topics, matched_result)
+        return matched_result
+
+    def find_closest_topics_batch(self, topics: List[str], reference_topics: List[str],
+                                  batch_size: int = 20) -> Dict[str, Tuple]:
+        """
+        Match topics against the reference list, sending unresolved topics to
+        the LLM batch_size at a time against one copy of the reference list.
+        """
+        if not reference_topics:
+            return {topic: (None, None) for topic in topics}
+        results, pending, narrowed = self._partition_topics(topics, reference_topics)
+
+        for topic, candidates in narrowed:
+            results[topic] = self._match_single(topic, candidates, reference_topics)
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            print(f"  Batch {start // batch_size + 1}: {len(batch)} topics")
+            results.update(self._match_batch(batch, reference_topics))
+        return results
+
+    def _partition_topics(self, topics: List[str], reference_topics: List[str]):
+        """
+        Split topics into locally resolved results, topics needing the full
+        reference list, and (topic, candidates) pairs needing only a narrowed one.
+        """
+        results, pending, narrowed = {}, [], []
+        for topic in topics:
+            if not topic:
+                results[topic] = (None, None)
+                continue
+            local_result, candidates = self._resolve_locally(topic, reference_topics)
+            if local_result is not None:
+                results[topic] = local_result
+            elif candidates is reference_topics:
+                pending.append(topic)
+            else:
+                narrowed.append((topic, candidates))
+        return results, pending, narrowed
+
+    def _match_batch(self, topics: List[str], reference_topics: List[str]) -> Dict[str, Tuple]:
+        """
+        Match one batch of topics in a single request.
+
+        Topics whose entry in the returned JSON is missing or unparseable fall
+        back to an individual find_closest_topic call.
+        """
+        results = {}
+        prompt = self.create_batch_categorization_prompt(topics, reference_topics)
+        try:
+            content = self.llm.complete(prompt, max_tokens=10 * len(topics) + 20, temperature=0.1,
+                                        json_mode=True)
+        except Exception as e:
+            print(f"Error categorizing batch of {len(topics)} topics: {str(e)}")
+            return {topic: (None, "api_error") for topic in topics}
+
+        results, failed = self._parse_batch_answers(topics, content, reference_topics)
+        for topic in failed:
+            # Per-item fallback
+            results[topic] = self._match_single(topic, reference_topics, reference_topics)
+        self._save_cache()
+        return results
+
+    def _parse_batch_answers(self, topics: List[str], content: str,
+                             reference_topics: List[str]) -> Tuple[Dict[str, Tuple], List[str]]:
+        """Parse a batch JSON response, caching good answers; returns (results, topics that failed)"""
+        try:
+            answers = json.loads(content)
+            if not isinstance(answers, dict):
+                raise ValueError("expected a JSON object")
+        except (TypeError, ValueError) as e:
+            print(f"    ⚠️  Could not parse batch response ({e}); falling back to single requests")
+            answers = {}
+
+        results, failed = {}, []
+        for i, topic in enumerate(topics, 1):
+            matched_result = self._parse_match(answers.get(f"T{i}"), reference_topics)
+            if matched_result[1] in ("parse_error", "invalid_response"):
+                failed.append(topic)
+            else:
+                results[topic] = matched_result
+                self._cache_result(topic, reference_topics, matched_result)
+        return results, failed
+
+    async def find_closest_topics_async(self, topics: List[str], reference_topics: List[str],
+                                        concurrency: int = 8, batch_size: int = 1,
+                                        semaphore: Optional[asyncio.Semaphore] = None) -> Dict[str, Tuple]:
+        """
+        Match topics with up to `concurrency` requests in flight, all passing
+        through the LLM client's rate limiter.
+
+        Results are merged (and cached) in the order of `topics`, regardless
+        of the order in which requests complete. Pass a semaphore to share the
+        concurrency limit between calls running at the same time.
+        """
+        if not reference_topics:
+            return {topic: (None, None) for topic in topics}
+        results, pending, narrowed = self._partition_topics(topics, reference_topics)
+
+        semaphore = semaphore or asyncio.Semaphore(concurrency)
+
+        async def complete(prompt, max_tokens, json_mode=False):
+            async with semaphore:
+                try:
+                    return await self.llm.complete_async(prompt, max_tokens=max_tokens, temperature=0.1,
+                                                         json_mode=json_mode)
+                except Exception as e:
+                    print(f"Error categorizing topics: {str(e)}")
+                    return None
+
+        # One async client for all requests of this event loop
+        async with self.llm.async_session():
+            singles = list(narrowed)
+            if batch_size > 1:
+                batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+                contents = await asyncio.gather(*[
+                    complete(self.create_batch_categorization_prompt(batch, reference_topics),
+                             10 * len(batch) + 20, json_mode=True)
+                    for batch in batches])
+                for batch, content in zip(batches, contents):
+                    if content is None:
+                        results.update({topic: (None, "api_error") for topic in batch})
+                        continue
+                    batch_results, failed = self._parse_batch_answers(batch, content, reference_topics)
+                    results.update(batch_results)
+                    singles += [(topic, reference_topics) for topic in failed]
+            else:
+                singles += [(topic, reference_topics) for topic in pending]
+
+            contents = await asyncio.gather(*[
+                complete(self.create_categorization_prompt(topic, candidates), 10)
+                for topic, candidates in singles])
+            for (topic, candidates), content in zip(singles, contents):
+                results[topic] = ((None, "api_error") if content is None
+                                  else self._parse_match(content, candidates, len(reference_topics)))
+                self._cache_result(topic, reference_topics, results[topic])
+
+        self._save_cache()
+        return {topic: results[topic] for topic in topics}
 
     def categorize_dataframe_topics(self, df: pd.DataFrame, reference_topics: List[str],
-                                    topic_column: str = 'topic') -> pd.DataFrame:
-        """Categorize all topics in a dataframe against reference topics"""
+                                    topic_column: str = 'topic', inplace: bool = False,
+                                    batch_size: int = 1, concurrency: int = 0,
+                                    reference_schedule: Optional[pd.DataFrame] = None,
+                                    week_column: str = 'week_start', week_window: int = 1) -> pd.DataFrame:
+        """
+        Categorize all topics in a dataframe against reference topics
+
+        Spellings with the same canonical form (see canonicalize) are matched
+        once; the form is kept in a 'canonical_topic' column for provenance.
+        With inplace=True the match columns are added to df itself instead of a copy.
+        With batch_size > 1, unmatched topics are sent to the LLM batch_size at a time.
+        With concurrency > 0, requests run asynchronously, that many at a time.
+        With a reference_schedule (see get_reference_schedule), each response is
+        matched only against topics scheduled within week_window weeks of its
+        week_column; responses without a week, with no topics in the window, or
+        with no match in the window fall back to the full reference list.
+        """
         if topic_column not in df.columns:
             raise ValueError(f"Column '{topic_column}' not found in dataframe")
 
-        df_copy = df.copy()
-        df_copy['matched_topic'] = None
-        df_copy['match_confidence'] = None
+        df_copy = df if inplace else df.copy()
+
+        # One representative spelling per canonical form goes to the matcher
+        canonical_mapping = {topic: self.canonicalize(topic)
+                             for topic in df_copy[topic_column].dropna().unique()}
+        representatives = {}
+        for topic, canonical in canonical_mapping.items():
+            representatives.setdefault(canonical, topic)
+        representative = {topic: representatives[canonical]
+                          for topic, canonical in canonical_mapping.items()}
+
+        if reference_schedule is None:
+            print(f"Processing {len(representatives)} unique topics "
+                  f"({len(canonical_mapping)} spellings)...")
+            refs = tuple(reference_topics)
+            results = self._categorize_topics(
+                {refs: list(representatives.values())}, batch_size, concurrency)
+            codes = None
+            topic_mapping = {topic: results[refs, rep][0] for topic, rep in representative.items()}
+            confidence_mapping = {topic: results[refs, rep][1] for topic, rep in representative.items()}
+        else:
+            if week_column not in df_copy.columns:
+                raise ValueError(f"Column '{week_column}' not found in dataframe")
+            codes, pairs = pd.MultiIndex.from_arrays(
+                [df_copy[topic_column], df_copy[week_column]]).factorize()
+            pair_results = self._categorize_by_week(
+                [(representative.get(topic, topic), week) for topic, week in pairs], reference_topics, reference_schedule, week_window,
+                batch_size, concurrency)
+            topic_mapping = confidence_mapping = None
 
-        unique_topics = df_copy[topic_column].dropna().unique()
-        topic_mapping = {}
-        confidence_mapping = {}
+        self._save_cache()
 
-        print(f"Processing {len(unique_topics)} unique topics...")
+        # Apply mappings to dataframe
+        if codes is None:
+            df_copy['matched_topic'] = df_copy[topic_column].map(topic_mapping)
+            df_copy['match_confidence'] = df_copy[topic_column].map(
+                confidence_mapping)
+        else:
+            matched = np.array([result[0] for result in pair_results], dtype=object)
+            confidence = np.array([result[1] for result in pair_results], dtype=object)
+            df_copy['matched_topic'] = pd.Series(matched[codes], index=df_copy.index)
+            df_copy['match_confidence'] = pd.Series(confidence[codes], index=df_copy.index)
 
-        for i, topic in enumerate(unique_topics, 1):
-            print(f"  {i}/{len(unique_topics)}: '{topic}'")
-            matched_topic, confidence = self.find_closest_topic(
-                topic, reference_topics)
-            topic_mapping[topic] = matched_topic
-            confidence_mapping[topic] = confidence
+        df_copy['canonical_topic'] = df_copy[topic_column].map(canonical_mapping)
 
-        # Apply mappings to dataframe
-        df_copy['matched_topic'] = df_copy[topic_column].map(topic_mapping)
-        df_copy['match_confidence'] = df_copy[topic_column].map(
-            confidence_mapping)
+        # Keep compact frames compact
+        if isinstance(df_copy[topic_column].dtype, pd.CategoricalDtype):
+            df_copy['canonical_topic'] = df_copy['canonical_topic'].astype('category')
+            df_copy['matched_topic'] = df_copy['matched_topic'].astype('category')
+            df_copy['match_confidence'] = df_copy['match_confidence'].astype('category')
 
         return df_copy
 
+    def _categorize_by_week(self, pairs: List[Tuple], reference_topics: List[str],
+                            reference_schedule: pd.DataFrame, week_window: int,
+                            batch_size: int, concurrency: int) -> List[Tuple]:
+        """Match (topic, week) pairs against the topics scheduled around each week"""
+        weeks = reference_schedule['week_start']
+        window = pd.Timedelta(weeks=week_window)
+        candidates_by_week = {}
+        groups: Dict[Tuple[str, ...], List[str]] = {}
+        pair_refs = []
+        for topic, week in pairs:
+            if pd.isna(topic):
+                pair_refs.append(None)
+                continue
+            if week not in candidates_by_week:
+                candidates = ()
+                if pd.notna(week):
+                    in_window = ((weeks - week).abs() <= window).to_numpy()
+                    candidates = tuple(dict.fromkeys(reference_schedule.loc[in_window, 'topic']))
+                candidates_by_week[week] = candidates or tuple(reference_topics)
+            refs = candidates_by_week[week]
+            pair_refs.append(refs)
+            groups.setdefault(refs, [])
+            if topic not in groups[refs]:
+                groups[refs].append(topic)
+
+        full_refs = tuple(reference_topics)
+        print(f"Processing {sum(len(topics) for topics in groups.values())} unique topic/week pairs "
+              f"in {len(groups)} week windows...")
+        results = self._categorize_topics(groups, batch_size, concurrency)
+
+        # Topics with no match in their window get another try against the full list
+        retry = list(dict.fromkeys(
+            topic for refs, topics in groups.items() if refs != full_refs
+            for topic in topics if results[refs, topic][1] == "no_match"))
+        if retry:
+            print(f"  Retrying {len(retry)} topics unmatched in their week window against all reference topics...")
+            results.update(self._categorize_topics({full_refs: retry}, batch_size, concurrency))
+
+        pair_results = []
+        for (topic, _), refs in zip(pairs, pair_refs):
+            if refs is None:
+                pair_results.append((None, None))
+                continue
+            result = results[refs, topic]
+            if result[1] == "no_match" and (full_refs, topic) in results:
+                result = results[full_refs, topic]
+            pair_results.append(result)
+        return pair_results
+
+    def _categorize_topics(self, groups: Dict[Tuple[str, ...], List[str]],
+                           batch_size: int, concurrency: int) -> Dict:
+        """
+        Categorize each group of topics against its reference list.
+
+        Returns results keyed by (reference list, topic).
+        """
+        if concurrency > 0:
+            async def run_groups():
+                semaphore = asyncio.Semaphore(concurrency)
+                async with self.llm.async_session():
+                    return await asyncio.gather(*[
+                        self.find_closest_topics_async(topics, list(refs), concurrency, batch_size, semaphore)
+                        for refs, topics in groups.items()])
+            group_results = asyncio.run(run_groups())
+        elif batch_size > 1:
+            group_results = [self.find_closest_topics_batch(topics, list(refs), batch_size)
+                             for refs, topics in groups.items()]
+        else:
+            group_results = []
+            for refs, topics in groups.items():
+                results = {}
+                for i, topic in enumerate(topics, 1):
+                    print(f"  {i}/{len(topics)}: '{topic}'")
+                    results[topic] = self.find_closest_topic(topic, list(refs))
+                group_results.append(results)
+
+        return {(refs, topic): result
+                for refs, results in zip(groups, group_results)
+                for topic, result in results.items()}
+
     def get_categorization_summary(self, df: pd.DataFrame, topic_column: str = 'topic',
                                    matched_column: str = 'matched_topic') -> Dict:
         """Get summary statistics of the topic categorization"""
@@ -209,12 +666,10 @@ class TopicCategorizer:
             'mapping_details': mapping_counts.to_dict('records') if not mapping_counts.empty else []
         }
 
-    def get_reference_topics(self, column, filepath="https://docs.google.com/spreadsheets/d/1i5OZu7UVwcwQpYk7R8gSwvlW3FigO906etXPYG4t_Ec/export?format=csv&gid=0"):
-        df = pd.read_csv(filepath)
-        df["week_start"] = pd.to_datetime(
-            df["Week Start"], format="%Y/%m/%d", errors='coerce')
-        df = df[df["week_start"] <= pd.Timestamp.today()]
-        topics = df[column].dropna().tolist()
-        topics = [topic for topic in topics if not any(
-            substring in topic.upper() for substring in ["NO WONDER SESSION", "NO SEMINAR", "NO WS", "NO SEM"])]
-        return topics
+    def get_reference_topics(self, column, filepath=PLANNING_SHEET_URL):
+        """Reference topics for a planning-sheet column (the sheet is fetched once per run)"""
+        return get_reference_provider(filepath).topics(column)
+
+    def get_reference_schedule(self, column, filepath=PLANNING_SHEET_URL) -> pd.DataFrame:
+        """Reference topics for a planning-sheet column with their week_start"""
+        return get_reference_provider(filepath).schedule(column)